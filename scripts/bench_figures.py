@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+图形分类校验 - 对比连通域特征分类（extract_figures.classify_components）与原先的霍夫线分类
+1. 合成样例：在一张页面上画出类型已知的图形（三角形、带对角线的矩形、圆、数轴、表格等），
+   检查新分类是否与预期一致，同时列出原先霍夫线分类的结果
+2. --source：在真实页面上检测图形区域，统计两种分类的一致率，列出不一致的区域
+修改 classify_components 的门限后运行一次，合成样例不一致时以非零状态退出。
+
+用法:
+  python3 bench_figures.py
+  python3 bench_figures.py --source 图片目录 --limit 20
+"""
+
+import argparse
+import sys
+from collections import Counter
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from extract_figures import find_figure_regions
+from page_image import Page, encode_image
+
+def legacy_figure_type(roi):
+    """原先的分类：Canny + HoughLinesP，按水平/竖直线段数量判断（全分辨率灰度区域）"""
+    if roi.size == 0:
+        return 'unknown'
+    edges = cv2.Canny(roi, 50, 150)
+    lines = cv2.HoughLinesP(edges, 1, np.pi / 180, threshold=50, minLineLength=30, maxLineGap=10)
+    if lines is None:
+        return 'shape'
+
+    horizontal_count = 0
+    vertical_count = 0
+    for line in lines:
+        x1, y1, x2, y2 = line[0]
+        angle = np.arctan2(y2 - y1, x2 - x1) * 180 / np.pi
+        if abs(angle) < 10 or abs(angle) > 170:
+            horizontal_count += 1
+        elif 80 < abs(angle) < 100:
+            vertical_count += 1
+
+    if horizontal_count > 3 and vertical_count < 2:
+        return 'number_line'
+    elif horizontal_count > 2 and vertical_count > 2:
+        return 'table'
+    elif len(lines) > 5:
+        return 'geometry'
+    else:
+        return 'shape'
+
+def draw_sample(name):
+    """画一个合成图形，返回 (灰度图, 预期类型)"""
+    canvas = np.full((400, 600), 255, np.uint8)
+    if name == "三角形":
+        cv2.polylines(canvas, [np.array([[50, 350], [550, 350], [300, 50]])], True, 0, 3)
+        return canvas, 'geometry'
+    if name == "斜三角形":
+        cv2.polylines(canvas, [np.array([[80, 300], [520, 370], [200, 40]])], True, 0, 3)
+        return canvas, 'geometry'
+    if name == "矩形+对角线":
+        cv2.rectangle(canvas, (60, 60), (540, 340), 0, 3)
+        cv2.line(canvas, (60, 60), (540, 340), 0, 3)
+        return canvas, 'geometry'
+    if name == "四边形+对角线":
+        cv2.polylines(canvas, [np.array([[100, 80], [520, 60], [560, 330], [40, 360]])], True, 0, 3)
+        cv2.line(canvas, (100, 80), (560, 330), 0, 3)
+        return canvas, 'geometry'
+    if name == "圆":
+        cv2.circle(canvas, (300, 200), 150, 0, 3)
+        cv2.line(canvas, (150, 200), (450, 200), 0, 3)
+        return canvas, 'geometry'
+    if name == "数轴":
+        canvas = np.full((200, 1000), 255, np.uint8)
+        cv2.arrowedLine(canvas, (20, 100), (980, 100), 0, 3, tipLength=0.02)
+        for x in range(80, 960, 100):
+            cv2.line(canvas, (x, 80), (x, 100), 0, 3)
+            cv2.putText(canvas, str(x // 100 - 4), (x - 8, 150), cv2.FONT_HERSHEY_SIMPLEX, 1.2, 0, 3)
+        return canvas, 'number_line'
+    if name == "表格":
+        for y in range(40, 361, 80):
+            cv2.line(canvas, (40, y), (560, y), 0, 2)
+        for x in range(40, 561, 130):
+            cv2.line(canvas, (x, 40), (x, 360), 0, 2)
+        for y in range(70, 361, 80):
+            for x in range(70, 561, 130):
+                cv2.putText(canvas, "12", (x, y + 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+        return canvas, 'table'
+    raise ValueError(name)
+
+SAMPLES = ["三角形", "斜三角形", "矩形+对角线", "四边形+对角线", "圆", "数轴", "表格"]
+
+def render_page(samples=SAMPLES, gap=150, size=(4400, 2000)):
+    """把样例竖向排在一张页面上，返回 (Page, [(名称, 预期类型, 起始y), ...])"""
+    page = np.full(size, 255, np.uint8)
+    placed = []
+    y = 100
+    for name in samples:
+        figure, expected = draw_sample(name)
+        h, w = figure.shape
+        page[y:y + h, 300:300 + w] = figure
+        placed.append((name, expected, y))
+        y += h + gap
+    data = encode_image(cv2.cvtColor(page, cv2.COLOR_GRAY2BGR), '.jpg')
+    return Page(Path("synthetic.jpg"), data), placed
+
+def classify_page(page):
+    """检测页面上的图形区域，返回 [(区域, 新分类, 原分类), ...]"""
+    results = []
+    for fig in find_figure_regions(page):
+        roi = page.gray[fig['y']:fig['y'] + fig['h'], fig['x']:fig['x'] + fig['w']]
+        results.append((fig, fig['type'], legacy_figure_type(roi)))
+    return results
+
+def check_synthetic():
+    """合成样例校验，返回不符合预期的数量"""
+    page, placed = render_page()
+    found = {}
+    for fig, new, old in classify_page(page):
+        name, expected, _ = min(placed, key=lambda p: abs(p[2] - fig['y']))
+        found[name] = (expected, new, old, fig['confidence'])
+
+    failures = 0
+    for name, expected, _ in placed:
+        if name not in found:
+            print(f"  {name:<8} ❌ 未检出")
+            failures += 1
+            continue
+        expected, new, old, conf = found[name]
+        ok = new == expected
+        failures += not ok
+        print(f"  {name:<8} {'✅' if ok else '❌'} 预期 {expected:<12} 新 {new:<12} 原 {old:<12} 置信度 {conf:.2f}")
+    return failures
+
+def compare_pages(source, limit):
+    """真实页面：统计两种分类的一致率"""
+    pairs = Counter()
+    for path in sorted(Path(source).glob("*.jpg"))[:limit]:
+        for fig, new, old in classify_page(Page(path)):
+            pairs[(new, old)] += 1
+            if new != old:
+                print(f"  {path.name} ({fig['x']}, {fig['y']}, {fig['w']}, {fig['h']})  新 {new}  原 {old}")
+    total = sum(pairs.values())
+    same = sum(n for (new, old), n in pairs.items() if new == old)
+    print(f"  共 {total} 个区域，一致 {same} 个（{same / total:.0%}）" if total else "  没有检出图形区域")
+    for (new, old), n in sorted(pairs.items(), key=lambda kv: -kv[1]):
+        print(f"    新 {new:<12} 原 {old:<12} {n}")
+
+def main():
+    parser = argparse.ArgumentParser(description="图形分类校验")
+    parser.add_argument('--source', type=Path, help="另在该目录的真实页面上对比两种分类")
+    parser.add_argument('--limit', type=int, default=20, help="最多检查的真实页面数")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🔷 图形分类校验")
+    print("=" * 60)
+    print("合成样例:")
+    failures = check_synthetic()
+    if args.source:
+        print("-" * 60)
+        print(f"真实页面: {args.source}")
+        compare_pages(args.source, args.limit)
+    print("-" * 60)
+    print(f"{'✅ 合成样例全部符合预期' if not failures else f'❌ {failures} 个合成样例不符合预期'}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
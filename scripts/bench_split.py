@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+分割方法基准测试 - 在带标注的页面上评估各分割方法的速度与准确度
+指标: 延迟分位数、Tesseract调用次数、峰值内存、分割误差（像素）
+标注来源:
+  1. preview/crop-tool.html 导出的 crop-config.json（cropPositions: {文件名: 比例}）
+  2. --synthetic N：离线生成 N 张已知分割位置的合成页面
+另外对比金字塔检测与全分辨率检测的速度和位置差异（线检测、数轴、图形区域）。
+结果写入JSON报告，便于在多次改动之间对比。
+
+用法:
+  python3 bench_split.py --labels crop-config.json
+  python3 bench_split.py --synthetic 20 --report split_bench.json
+"""
+
+import argparse
+import json
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import extract_figures
+import ocr_cache
+import smart_crop
+from ocr_engine import get_engine
+from page_image import Page
+from smart_crop import (DEFAULT_RATIO, SOURCE_DIR, detect_horizontal_line, find_blank_gutter,
+                        find_header_template, find_keyword_position, find_split)
+
+# 配置
+LABELS_PATH = SOURCE_DIR / "crop-config.json"
+REPORT_PATH = Path("split_bench.json")
+TOLERANCE_PX = 30  # 误差在此范围内视为命中
+
+# 参与评测的分割方法: 名称 -> 函数(page) -> y坐标或None
+METHODS = {
+    "投影": lambda page: find_blank_gutter(page)[0],
+    "OCR": lambda page: find_keyword_position(page)[0],
+    "线检测": lambda page: detect_horizontal_line(page)[0],
+    "模板": lambda page: find_header_template(page)[0],
+    "默认": lambda page: int(page.height * DEFAULT_RATIO),
+    "级联": lambda page: find_split(page)[1],
+}
+
+def load_labels(labels_path, source_dir):
+    """读取 crop-tool 导出的标注，返回 [(图片路径, 分割比例), ...]"""
+    config = json.loads(Path(labels_path).read_text(encoding='utf-8'))
+    samples = []
+    for filename, ratio in sorted(config['cropPositions'].items()):
+        path = Path(source_dir) / filename
+        if path.exists():
+            samples.append((path, float(ratio)))
+    return samples
+
+def render_synthetic(out_dir, count, seed=0, size=(2000, 3000)):
+    """
+    生成合成页面：上下两段"文字行"，中间是空白带和标题块，部分页面带分隔线
+    标注为空白带中线对应的比例
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    samples = []
+    for k in range(count):
+        img = np.full((height, width), 255, np.uint8)
+        gutter_top = int(height * rng.uniform(0.38, 0.58))
+        gutter = int(rng.integers(60, 140))
+        header_top = gutter_top + gutter
+        line_h = int(rng.integers(40, 70))
+
+        # 文字行：随机宽度的深色小块
+        for y in range(150, height - 150, line_h):
+            if gutter_top - line_h < y < header_top + line_h:
+                continue
+            for x in range(150, width - 150, 42):
+                if rng.random() < 0.8:
+                    img[y:y + 28, x:x + 30] = rng.integers(0, 60)
+
+        # 标题块与可选的分隔线
+        for x in range(150, 150 + 4 * 60, 60):
+            img[header_top:header_top + 44, x:x + 48] = 20
+        if rng.random() < 0.5:
+            y = gutter_top + gutter // 2
+            img[y:y + 3, 100:width - 100] = 0
+
+        path = Path(out_dir) / f"synthetic_{k:03d}.jpg"
+        cv2.imwrite(str(path), img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        samples.append((path, (gutter_top + gutter / 2) / height))
+    return samples
+
+def _peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以KB为单位，macOS 以字节为单位
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+def run_method(name, samples):
+    """
+    在独立进程中运行一种方法，保证峰值内存互不干扰
+    返回: (逐页记录列表, 峰值内存MB)
+    """
+    ocr_cache.CACHE_ENABLED = False
+    detect = METHODS[name]
+    engine = get_engine()
+    records = []
+    for path, ratio in samples:
+        page = Page(path, path.read_bytes())  # 解码计入：各方法解码的分辨率不同
+        calls = engine.calls
+        start = time.perf_counter()
+        split_y = detect(page)
+        elapsed = time.perf_counter() - start
+        truth = int(ratio * page.height)
+        records.append({
+            'page': path.name,
+            'truth': truth,
+            'split_y': None if split_y is None else int(split_y),
+            'error_px': None if split_y is None else abs(int(split_y) - truth),
+            'latency_ms': elapsed * 1000,
+            'ocr_calls': engine.calls - calls,
+        })
+    return records, _peak_rss_mb()
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else None
+
+def summarize(records, peak_rss):
+    latencies = [r['latency_ms'] for r in records]
+    errors = [r['error_px'] for r in records if r['error_px'] is not None]
+    return {
+        'pages': len(records),
+        'detected': len(errors),
+        'latency_ms': {
+            'mean': statistics.fmean(latencies) if latencies else None,
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99),
+        },
+        'ocr_calls': {
+            'total': sum(r['ocr_calls'] for r in records),
+            'per_page': sum(r['ocr_calls'] for r in records) / len(records) if records else 0,
+        },
+        'peak_rss_mb': peak_rss,
+        'error_px': {
+            'mean': statistics.fmean(errors) if errors else None,
+            'p50': percentile(errors, 50),
+            'p90': percentile(errors, 90),
+            'max': max(errors) if errors else None,
+        },
+        'hit_rate': sum(e <= TOLERANCE_PX for e in errors) / len(records) if records else 0,
+    }
+
+# 金字塔对比: 名称 -> (函数(page, scale) -> 检测到的位置列表, 金字塔倍数)
+PYRAMID_DETECTORS = {
+    "线检测": (lambda page, scale: [y for y in [detect_horizontal_line(page, scale)[0]] if y is not None],
+              smart_crop.PYRAMID_SCALE),
+    "数轴": (lambda page, scale: [(f['x'], f['y']) for f in
+                                 extract_figures.extract_number_line(page, None, scale)],
+             extract_figures.PYRAMID_SCALE),
+    "图形区域": (lambda page, scale: [(f['x'], f['y']) for f in
+                                   extract_figures.find_figure_regions(page, scale)],
+               extract_figures.PYRAMID_SCALE),
+}
+
+def _position_diff(full, pyramid):
+    """每个全分辨率结果到最近金字塔结果的距离（像素，取各坐标差的最大值）"""
+    if not full or not pyramid:
+        return []
+    a = np.array(full, dtype=float).reshape(len(full), -1)
+    b = np.array(pyramid, dtype=float).reshape(len(pyramid), -1)
+    dist = np.abs(a[:, None, :] - b[None, :, :]).max(axis=2)
+    return dist.min(axis=1).tolist()
+
+def compare_pyramid(samples):
+    """对比金字塔检测与全分辨率检测的耗时和位置差异"""
+    results = {}
+    for name, (detect, scale) in PYRAMID_DETECTORS.items():
+        times = {1: [], scale: []}
+        diffs = []
+        found = {1: 0, scale: 0}
+        for path, _ in samples:
+            data = path.read_bytes()
+            positions = {}
+            for s in (1, scale):
+                page = Page(path, data)  # 各自解码：缩小图走DCT缩放解码
+                start = time.perf_counter()
+                positions[s] = detect(page, s)
+                times[s].append((time.perf_counter() - start) * 1000)
+                found[s] += len(positions[s])
+            diffs += _position_diff(positions[1], positions[scale])
+        full_ms, pyr_ms = statistics.fmean(times[1]), statistics.fmean(times[scale])
+        results[name] = {
+            'scale': scale,
+            'full_ms': full_ms,
+            'pyramid_ms': pyr_ms,
+            'speedup': full_ms / pyr_ms if pyr_ms else None,
+            'found_full': found[1],
+            'found_pyramid': found[scale],
+            'diff_px': {
+                'mean': statistics.fmean(diffs) if diffs else None,
+                'max': max(diffs) if diffs else None,
+            },
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="分割方法基准测试")
+    parser.add_argument('--labels', type=Path, default=LABELS_PATH,
+                        help="crop-tool 导出的 crop-config.json")
+    parser.add_argument('--source', type=Path, default=SOURCE_DIR, help="标注对应的图片目录")
+    parser.add_argument('--synthetic', type=int, default=0, help="改用 N 张合成页面")
+    parser.add_argument('--methods', nargs='+', default=list(METHODS), choices=list(METHODS))
+    parser.add_argument('--report', type=Path, default=REPORT_PATH)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            samples = render_synthetic(tmp, args.synthetic)
+            dataset = {'type': 'synthetic', 'pages': len(samples)}
+        else:
+            samples = load_labels(args.labels, args.source)
+            dataset = {'type': 'labels', 'path': str(args.labels), 'pages': len(samples)}
+
+        if not samples:
+            print("❌ 没有可用的标注页面")
+            return
+
+        print("=" * 60)
+        print(f"📏 分割方法基准测试（{len(samples)} 张页面）")
+        print("=" * 60)
+        if "模板" in args.methods and not smart_crop.KEYWORDS:
+            print("⚠️  没有标题模板，模板方法不会有结果（先运行 harvest_templates.py）")
+
+        results = {}
+        ctx = get_context('spawn')
+        for name in args.methods:
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                records, peak_rss = pool.submit(run_method, name, samples).result()
+            results[name] = summarize(records, peak_rss)
+            results[name]['records'] = records
+
+            s = results[name]
+            err = s['error_px']['mean']
+            print(f"{name:<4} p50 {s['latency_ms']['p50']:8.1f} ms  p99 {s['latency_ms']['p99']:8.1f} ms  "
+                  f"OCR {s['ocr_calls']['per_page']:.1f} 次/页  RSS {peak_rss:6.0f} MB  "
+                  f"误差 {'-' if err is None else f'{err:.1f}'} px  命中 {s['hit_rate'] * 100:.0f}%")
+
+        print("-" * 60)
+        print("🔺 金字塔检测 vs 全分辨率")
+        pyramid = compare_pyramid(samples)
+        for name, r in pyramid.items():
+            diff = r['diff_px']['mean']
+            print(f"{name:<4} 1/{r['scale']}: {r['full_ms']:7.1f} ms -> {r['pyramid_ms']:7.1f} ms "
+                  f"({r['speedup']:.1f}x)  检出 {r['found_full']} -> {r['found_pyramid']}  "
+                  f"位置差 {'-' if diff is None else f'{diff:.1f}'} px")
+
+    report = {
+        'generated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'ocr_engine': get_engine().name,
+        },
+        'tolerance_px': TOLERANCE_PX,
+        'dataset': dataset,
+        'methods': results,
+        'pyramid': pyramid,
+    }
+    args.report.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print("-" * 60)
+    print(f"报告已写入: {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+增量构建清单 - crop_images / smart_crop / extract_figures 共用
+清单保存在输出目录下，记录每张输入图片的内容哈希、处理参数和产出文件。
+重新运行时跳过未变化的页面，只删除或重写过期的产出。
+"""
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+MANIFEST_NAME = ".manifest.json"
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def write_json(path, data):
+    """原子地写出JSON文件：先写临时文件再替换，中途中断不会留下写了一半的文件"""
+    path = Path(path)
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding='utf-8')
+    os.replace(tmp, path)
+
+def local_modules(entry):
+    """
+    入口脚本及其（直接或间接）导入的同目录模块的路径，按文件名排序
+    检测逻辑大多在被导入的模块里，只哈希入口脚本发现不了它们的修改；
+    在所有导入完成后（例如 main() 中）调用
+    """
+    folder = Path(entry).resolve().parent
+    paths = {Path(entry).resolve()}
+    for module in list(sys.modules.values()):
+        path = getattr(module, '__file__', None)
+        if path and Path(path).suffix == '.py' and Path(path).resolve().parent == folder:
+            paths.add(Path(path).resolve())
+    return sorted(paths, key=lambda p: p.name)
+
+def code_sha256(paths):
+    """多个源文件的组合哈希（文件名和内容）"""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(Path(path).name.encode('utf-8'))
+        digest.update(file_sha256(path).encode('ascii'))
+    return digest.hexdigest()
+
+class Manifest:
+    """
+    输出目录的构建清单
+    params: 影响产出的参数（可JSON序列化），变化后所有页面都会重建
+    code: 处理脚本路径或路径列表（通常为 local_modules(__file__)），任一文件内容变化同样视为参数变化
+    """
+
+    def __init__(self, output_dir, params, code=None):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / MANIFEST_NAME
+        params = dict(params)
+        if code is not None:
+            paths = [code] if isinstance(code, (str, os.PathLike)) else list(code)
+            params['code'] = code_sha256(paths)
+        # 经过一次JSON往返，保证元组/列表等与读回的清单可直接比较
+        self.params = json.loads(json.dumps(params, ensure_ascii=False))
+        self.entries = {}
+        if self.path.exists():
+            try:
+                self.entries = json.loads(self.path.read_text(encoding='utf-8'))['entries']
+            except (ValueError, KeyError):
+                self.entries = {}
+
+    def is_fresh(self, src, deps=None):
+        """
+        输入、参数均未变化且产出文件都在时返回True
+        deps: 该页其它输入的指纹（例如页面版面文件），与上次记录的不同也视为过期
+        """
+        src = Path(src)
+        entry = self.entries.get(src.name)
+        if entry is None or entry['params'] != self.params or entry.get('deps') != deps:
+            return False
+        if not all((self.output_dir / name).exists() for name in entry['outputs']):
+            return False
+        stat = src.stat()
+        if entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+            return True
+        # 时间戳变了但内容可能没变（例如重新拷贝），再比较哈希
+        if entry['sha256'] != file_sha256(src):
+            return False
+        entry['mtime'] = stat.st_mtime_ns
+        return True
+
+    def record(self, src, outputs, deps=None):
+        """记录一次成功的处理，并删除上次产出中已不再生成的文件"""
+        src = Path(src)
+        names = [Path(p).name for p in outputs]
+        old = self.entries.get(src.name)
+        if old:
+            self._remove(set(old['outputs']) - set(names))
+        stat = src.stat()
+        self.entries[src.name] = {
+            'sha256': file_sha256(src),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'params': self.params,
+            'deps': deps,
+            'outputs': names,
+        }
+
+    def prune(self, sources):
+        """删除已不存在的输入所对应的产出"""
+        names = {Path(p).name for p in sources}
+        removed = 0
+        for name in list(self.entries):
+            if name not in names:
+                removed += self._remove(self.entries.pop(name)['outputs'])
+        return removed
+
+    def _remove(self, names):
+        count = 0
+        for name in names:
+            path = self.output_dir / name
+            if path.exists():
+                path.unlink()
+                count += 1
+        return count
+
+    def save(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        write_json(self.path, {'entries': self.entries})
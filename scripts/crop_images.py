@@ -4,10 +4,17 @@
 将每张图片裁剪为上半部分（例题）和下半部分（习题）
 """
 
+import io
 import os
+import time
+from functools import partial
 from PIL import Image
 from pathlib import Path
 
+from build_manifest import Manifest, local_modules
+from jpeg_lossless import mcu_height, snap_to_mcu, split_jpeg
+from pipeline import run_pipeline
+
 # 配置
 SOURCE_DIR = Path("/Users/youyou/Downloads/M压轴/packages/图片")
 OUTPUT_DIR = Path("/Users/youyou/Downloads/M压轴/packages/图片_裁剪")
@@ -18,41 +25,72 @@ OUTPUT_DIR = Path("/Users/youyou/Downloads/M压轴/packages/图片_裁剪")
 EXAMPLE_RATIO = 0.48  # 例题占比（稍微靠上）
 EXERCISE_RATIO = 0.52  # 习题占比
 
+# 无损分割：分割点对齐到MCU行后直接裁剪DCT数据，不重新编码
+# 需要安装 jpegtran（macOS: brew install jpeg-turbo），不可用时自动退回重新编码
+LOSSLESS = True
+
+# 并行进程数，以及流水线中最多同时在途的页面数
+WORKERS = os.cpu_count() or 1
+QUEUE_DEPTH = WORKERS * 2
+
 def ensure_dir(path):
     """确保目录存在"""
     path.mkdir(parents=True, exist_ok=True)
 
+def encode(img, ext):
+    """把PIL图片编码为字节（JPEG质量95）"""
+    buf = io.BytesIO()
+    img.save(buf, format=Image.registered_extensions()[ext.lower()], quality=95)
+    return buf.getvalue()
+
+def split_page(image_path, data, output_dir):
+    """
+    流水线工作进程中执行的单页任务
+    LOSSLESS 开启时优先无损分割，无法无损分割时退回解码+重新编码
+    返回: ((模式, 耗时秒数), [(例题路径, 字节), (习题路径, 字节)])，模式为 "无损" 或 "编码"
+    """
+    start = time.perf_counter()
+    img = Image.open(io.BytesIO(data))
+    width, height = img.size
+    
+    # 计算裁剪位置
+    # 找到"针对训练"分隔线的位置（大约在图片的50-60%处）
+    split_point = int(height * EXAMPLE_RATIO)
+    
+    # 生成输出文件名
+    filename = image_path.stem
+    ext = image_path.suffix
+    
+    example_path = output_dir / f"{filename}_例题{ext}"
+    exercise_path = output_dir / f"{filename}_习题{ext}"
+    
+    # 无损模式：分割点对齐到MCU边界，不解码也不重新编码
+    if LOSSLESS and img.format == "JPEG":
+        mcu = mcu_height(img)
+        parts = split_jpeg(data, width, height, snap_to_mcu(split_point, mcu), mcu)
+        if parts:
+            outputs = [(example_path, parts[0]), (exercise_path, parts[1])]
+            return ("无损", time.perf_counter() - start), outputs
+    
+    # 裁剪例题部分（上半部分）
+    example_img = img.crop((0, 0, width, split_point))
+    
+    # 裁剪习题部分（下半部分）
+    exercise_img = img.crop((0, split_point, width, height))
+    
+    outputs = [(example_path, encode(example_img, ext)), (exercise_path, encode(exercise_img, ext))]
+    return ("编码", time.perf_counter() - start), outputs
+
 def crop_image(image_path, output_dir):
     """
-    裁剪单张图片
-    返回: (例题图片路径, 习题图片路径) 或 None
+    裁剪单张图片并保存
+    返回: (例题图片路径, 习题图片路径, 模式) 或 None
     """
     try:
-        img = Image.open(image_path)
-        width, height = img.size
-        
-        # 计算裁剪位置
-        # 找到"针对训练"分隔线的位置（大约在图片的50-60%处）
-        split_point = int(height * EXAMPLE_RATIO)
-        
-        # 裁剪例题部分（上半部分）
-        example_img = img.crop((0, 0, width, split_point))
-        
-        # 裁剪习题部分（下半部分）
-        exercise_img = img.crop((0, split_point, width, height))
-        
-        # 生成输出文件名
-        filename = image_path.stem
-        ext = image_path.suffix
-        
-        example_path = output_dir / f"{filename}_例题{ext}"
-        exercise_path = output_dir / f"{filename}_习题{ext}"
-        
-        # 保存裁剪后的图片
-        example_img.save(example_path, quality=95)
-        exercise_img.save(exercise_path, quality=95)
-        
-        return example_path, exercise_path
+        (mode, _), outputs = split_page(image_path, image_path.read_bytes(), output_dir)
+        for path, data in outputs:
+            path.write_bytes(data)
+        return outputs[0][0], outputs[1][0], mode
         
     except Exception as e:
         print(f"  ❌ 处理失败: {image_path.name} - {e}")
@@ -65,6 +103,7 @@ def main():
     print(f"源目录: {SOURCE_DIR}")
     print(f"输出目录: {OUTPUT_DIR}")
     print(f"裁剪比例: 例题 {EXAMPLE_RATIO*100:.0f}% / 习题 {EXERCISE_RATIO*100:.0f}%")
+    print(f"无损分割: {'开启' if LOSSLESS else '关闭'}")
     print("=" * 60)
     
     # 确保输出目录存在
@@ -72,26 +111,58 @@ def main():
     
     # 获取所有图片文件
     image_files = sorted(SOURCE_DIR.glob("*.jpg"))
-    total = len(image_files)
     
-    print(f"\n找到 {total} 张图片")
+    # 增量构建：跳过输入和参数都未变化的页面
+    params = {"example_ratio": EXAMPLE_RATIO, "lossless": LOSSLESS}
+    manifest = Manifest(OUTPUT_DIR, params, code=local_modules(__file__))
+    removed = manifest.prune(image_files)
+    pending = [p for p in image_files if not manifest.is_fresh(p)]
+    total = len(pending)
+    
+    print(f"\n找到 {len(image_files)} 张图片，其中 {total} 张需要处理")
+    if removed:
+        print(f"已删除 {removed} 个过期文件")
     print("-" * 60)
     
     success_count = 0
     fail_count = 0
+    # 各模式的 [张数, 耗时, 输入字节, 输出字节]
+    mode_stats = {}
+    process = partial(split_page, output_dir=OUTPUT_DIR)
+    start = time.perf_counter()
     
-    for i, img_path in enumerate(image_files, 1):
-        print(f"[{i}/{total}] 处理: {img_path.name}", end=" ")
-        result = crop_image(img_path, OUTPUT_DIR)
-        if result:
-            print("✅")
-            success_count += 1
-        else:
-            fail_count += 1
+    try:
+        for i, img_path, info, written, error in run_pipeline(pending, process, WORKERS, QUEUE_DEPTH):
+            print(f"[{i + 1}/{total}] 处理: {img_path.name}", end=" ")
+            if info:
+                mode, elapsed = info
+                print(f"✅ [{mode}]")
+                manifest.record(img_path, written)
+                success_count += 1
+                entry = mode_stats.setdefault(mode, [0, 0.0, 0, 0])
+                entry[0] += 1
+                entry[1] += elapsed
+                entry[2] += img_path.stat().st_size
+                entry[3] += sum(p.stat().st_size for p in written)
+            else:
+                print(f"❌ 处理失败: {error}")
+                fail_count += 1
+    finally:
+        manifest.save()
+    wall = time.perf_counter() - start
     
     print("-" * 60)
     print(f"\n✅ 成功: {success_count} 张")
+    print(f"⏭️  跳过: {len(image_files) - total} 张（未变化）")
     print(f"❌ 失败: {fail_count} 张")
+    
+    if total and wall:
+        print(f"⏱️  总耗时 {wall:.1f} 秒（{WORKERS} 进程, {(success_count + fail_count) / wall:.1f} 张/秒）")
+    for mode, (count, seconds, in_bytes, out_bytes) in mode_stats.items():
+        rate = count / seconds if seconds else 0
+        print(f"  [{mode}] {count} 张, 单进程 {rate:.1f} 张/秒, "
+              f"输出 {out_bytes / 1024 / 1024:.1f} MB（原图 {in_bytes / 1024 / 1024:.1f} MB, "
+              f"{out_bytes / in_bytes * 100:.0f}%）")
     print(f"\n裁剪后的图片保存在: {OUTPUT_DIR}")
     
     # 统计输出
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+按题目裁剪 - 为 app 的每道题生成一张只包含该题的小图，代替整页扫描
+题目来源: packages/app/features/problem/mock-data.ts 中每道题的 id、images（所在页面）和 pageNumber
+在页面版面（page_layout.py，没有时整页OCR并读缓存）中找各题的起始位置：
+  tN-example          "例1"、"例题"等开头的行
+  tN-train-K          "针对训练"标题下方以 "K." 开头的行
+  zN-quiz-K 等        以 "K." 开头的行
+每题从自己的起始行裁到下一个起始行（或标题、页脚），再收紧到墨迹范围。
+找不到起始行时退回分割点上下的整段（例题取上段，其余取下段）。
+同时检查页脚印刷的页码是否与 pageNumber 一致。
+结果写入输出目录，并生成 题目ID -> 裁剪图 的映射文件 question_crops.json。
+
+用法:
+  python3 crop_questions.py
+"""
+
+import json
+import os
+import re
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+
+from build_manifest import Manifest, local_modules, write_json
+from mock_data import MOCK_DATA, field_images, field_page_number, problem_blocks
+from page_image import Page, encode_image
+from page_layout import build_layout, group_lines, layout_stamp, load_layout
+from pipeline import run_pipeline
+from smart_crop import find_split
+
+# 配置
+SOURCE_DIR = Path("/Users/youyou/Downloads/M压轴/packages/图片")
+OUTPUT_DIR = Path("/Users/youyou/Downloads/M压轴/packages/题目裁剪")
+MAPPING_NAME = "question_crops.json"
+
+# 并行进程数，以及流水线中最多同时在途的页面数
+WORKERS = os.cpu_count() or 1
+QUEUE_DEPTH = WORKERS * 2
+
+# 裁剪图四周留白（像素）、JPEG质量
+PAD = 12
+QUALITY = 90
+
+# 起始行必须从左边距附近开始（页宽的比例），避免把正文中间的数字当成题号
+ANCHOR_INDENT = 0.06
+
+# 页脚区域（页高比例），其中只有数字的行视为印刷页码
+FOOTER = 0.92
+
+NUMBER_ANCHOR = re.compile(r'^(\d{1,2})[.．、]')
+EXAMPLE_ANCHOR = re.compile(r'^例\s*(?:\d+|题)')
+PROBLEM_ID = re.compile(r'^(?:t\d+-(?:example|train-(\d+))|(?:z\d+|final)-quiz-(\d+))$')
+
+def load_problems(path=None):
+    """
+    从 mock-data.ts（默认 MOCK_DATA）中读取每道题的 id、所在页面和页码
+    images 中已经是单独配图（.svg 等）而不是扫描页的题目不需要裁剪，跳过
+    返回: {页面文件名: [(题目ID, pageNumber或None), ...]}
+    """
+    pages = {}
+    for problem_id, block in problem_blocks(path or MOCK_DATA):
+        if not PROBLEM_ID.match(problem_id):
+            continue
+        scans = [name for name in field_images(block) if name.endswith('.jpg')]
+        for name in scans[:1]:
+            pages.setdefault(name, []).append((problem_id, field_page_number(block)))
+    return pages
+
+def layout_lines(layout):
+    """把版面中的词按OCR行拼接，返回 [(行首x, 行顶y, 行底y, 文本), ...]，按y排序"""
+    result = []
+    for words in group_lines(layout):
+        words.sort(key=lambda i: layout['left'][i])
+        result.append((min(layout['left'][i] for i in words),
+                       min(layout['top'][i] for i in words),
+                       max(layout['top'][i] + layout['height'][i] for i in words),
+                       ''.join(layout['text'][i].strip() for i in words)))
+    return sorted(result, key=lambda line: line[1])
+
+def find_anchors(lines, width, height):
+    """
+    找出页面上的题目起始行、"针对训练"标题和页脚
+    返回: (anchors, header_y, footer_y, 印刷页码)
+          anchors 为 [(y, 类型, 题号), ...]，类型为 'example' 或 'number'
+    """
+    body = [line for line in lines if line[1] < height * FOOTER]
+    footer = [line for line in lines if line[1] >= height * FOOTER]
+    margin = min((line[0] for line in body), default=0) + width * ANCHOR_INDENT
+
+    anchors = []
+    header_y = None
+    for x, top, _, text in body:
+        if header_y is None and ("针对训练" in text or "对训练" in text):
+            header_y = top
+            continue
+        if x > margin:
+            continue
+        if EXAMPLE_ANCHOR.match(text):
+            anchors.append((top, 'example', None))
+        elif (m := NUMBER_ANCHOR.match(text)):
+            anchors.append((top, 'number', int(m.group(1))))
+
+    printed = next((int(text) for _, _, _, text in footer if text.isdigit()), None)
+    footer_y = min((line[1] for line in footer), default=height)
+    return anchors, header_y, footer_y, printed
+
+def locate(problem_id, anchors, header_y):
+    """按题目ID选出起始行的y坐标，找不到返回None"""
+    m = PROBLEM_ID.match(problem_id)
+    if problem_id.endswith('-example'):
+        return next((y for y, kind, _ in anchors if kind == 'example'), None)
+    number = int(m.group(1) or m.group(2))
+    below = header_y if m.group(1) and header_y is not None else -1
+    return next((y for y, kind, n in anchors if kind == 'number' and n == number and y > below), None)
+
+def ink_bounds(page, top, bottom, scale=2):
+    """[top, bottom) 行区域内墨迹的包围框 (x0, y0, x1, y1)，在 1/scale 缩小图上统计；没有墨迹返回None"""
+    gray = page.small(scale)[top // scale:-(-bottom // scale)]
+    ys, xs = np.nonzero(gray < 200)
+    if len(ys) == 0:
+        return None
+    return (int(xs.min()) * scale, top // scale * scale + int(ys.min()) * scale,
+            (int(xs.max()) + 1) * scale, top // scale * scale + (int(ys.max()) + 1) * scale)
+
+def process_page(image_path, data, output_dir, problems):
+    """
+    流水线工作进程中执行的单页任务：为页面上的每道题裁剪一张图
+    problems: load_problems() 的结果
+    返回: ({题目ID: 映射记录}, [(输出路径, 字节), ...])
+    """
+    page = Page(image_path, data)
+    height, width = page.height, page.width
+    layout = load_layout(page)
+    if layout is None:
+        layout = build_layout(page)[0]
+    anchors, header_y, footer_y, printed = find_anchors(layout_lines(layout), width, height)
+
+    # 每个起始行都到下一个边界（下一个起始行、标题或页脚）为止
+    bounds = sorted({y for y, _, _ in anchors} | {footer_y} | ({header_y} - {None}))
+    split_y = None
+
+    info, outputs = {}, []
+    for problem_id, page_number in problems[page.path.name]:
+        top = locate(problem_id, anchors, header_y)
+        if top is not None:
+            method = "题号"
+            bottom = next(y for y in bounds if y > top)
+        else:
+            # 退回分割点上下的整段
+            method = "整段"
+            if split_y is None:
+                split_y = find_split(page)[1]
+            top, bottom = (0, split_y) if problem_id.endswith('-example') else (split_y, footer_y)
+
+        box = ink_bounds(page, top, bottom)
+        if box is None:
+            continue
+        x0, y0 = max(0, box[0] - PAD), max(0, box[1] - PAD)
+        x1, y1 = min(width, box[2] + PAD), min(height, box[3] + PAD)
+        name = f"{problem_id}{page.path.suffix}"
+        outputs.append((output_dir / name, encode_image(page.crop(y0, y1, x0, x1), page.path.suffix,
+                                                        quality=QUALITY)))
+        info[problem_id] = {
+            'file': name,
+            'page': page.path.name,
+            'box': [x0, y0, x1 - x0, y1 - y0],
+            'method': method,
+            'pageNumber': page_number,
+            'printedPage': printed,
+        }
+    return info, outputs
+
+def main():
+    print("=" * 60)
+    print("✂️  按题目裁剪")
+    print("=" * 60)
+    print(f"题目数据: {MOCK_DATA}")
+    print(f"源目录: {SOURCE_DIR}")
+    print(f"输出目录: {OUTPUT_DIR}")
+    print("=" * 60)
+
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    problems = load_problems()
+    image_files = [SOURCE_DIR / name for name in sorted(problems) if (SOURCE_DIR / name).exists()]
+    missing = sorted(set(problems) - {p.name for p in image_files})
+
+    # 增量构建：页面、版面和该页的题目列表都未变化时跳过
+    params = {"pad": PAD, "quality": QUALITY, "indent": ANCHOR_INDENT, "footer": FOOTER}
+    manifest = Manifest(OUTPUT_DIR, params, code=local_modules(__file__))
+    removed = manifest.prune(image_files)
+    deps = {p: json.dumps([layout_stamp(p), problems[p.name]]) for p in image_files}
+    pending = [p for p in image_files if not manifest.is_fresh(p, deps[p])]
+    total = len(pending)
+
+    print(f"\n{sum(len(v) for v in problems.values())} 道题分布在 {len(problems)} 张页面，"
+          f"其中 {total} 张需要处理")
+    if missing:
+        print(f"⚠️  源目录中缺少 {len(missing)} 张页面: {', '.join(missing)}")
+    if removed:
+        print(f"已删除 {removed} 个过期文件")
+    print("-" * 60)
+
+    # 映射文件：保留未变化页面的记录，去掉已不存在的题目
+    mapping_path = OUTPUT_DIR / MAPPING_NAME
+    try:
+        mapping = json.loads(mapping_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        mapping = {}
+    ids = {pid for page in problems.values() for pid, _ in page}
+    mapping = {pid: entry for pid, entry in mapping.items() if pid in ids}
+
+    stats = {"题号": 0, "整段": 0, "失败": 0}
+    process = partial(process_page, output_dir=OUTPUT_DIR, problems=problems)
+
+    try:
+        for i, img_path, info, written, error in run_pipeline(pending, process, WORKERS, QUEUE_DEPTH):
+            print(f"[{i + 1}/{total}] {img_path.name}", end=" ")
+            if error:
+                print(f"❌ 失败: {error}")
+                stats["失败"] += len(problems[img_path.name])
+                continue
+            manifest.record(img_path, written, deps[img_path])
+            for pid in [pid for pid, e in mapping.items() if e['page'] == img_path.name]:
+                del mapping[pid]
+            mapping.update(info)
+            for entry in info.values():
+                stats[entry['method']] += 1
+            print(f"✅ {len(info)} 道题  " + "  ".join(f"{pid}[{e['method']}]" for pid, e in info.items()))
+            checks = {e['pageNumber'] for e in info.values() if e['pageNumber'] is not None}
+            printed = next((e['printedPage'] for e in info.values()), None)
+            if printed is not None and checks and printed not in checks:
+                print(f"  ⚠️  页脚页码 {printed} 与 pageNumber {sorted(checks)} 不一致")
+    finally:
+        manifest.save()
+        write_json(mapping_path, dict(sorted(mapping.items())))
+
+    print("-" * 60)
+    print("\n📊 统计:")
+    for method, count in stats.items():
+        if count > 0:
+            print(f"  {method}: {count} 道")
+    print(f"\n映射文件: {mapping_path}")
+
+if __name__ == "__main__":
+    main()
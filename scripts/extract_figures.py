@@ -4,207 +4,358 @@
 从PDF图片中精确检测并裁剪出图形区域（数轴、几何图形、表格等）
 """
 
+import hashlib
 import os
 import sys
+from functools import partial
 from pathlib import Path
 
 try:
-    from PIL import Image
     import cv2
     import numpy as np
 except ImportError as e:
     print(f"缺少依赖: {e}")
-    print("请运行: pip3 install pillow opencv-python numpy")
+    print("请运行: pip3 install opencv-python numpy")
     sys.exit(1)
 
+from build_manifest import Manifest, local_modules
+from figure_index import book_page_numbers, get_index
+from horizontal_rules import find_horizontal_rules
+from page_image import Page, as_page, encode_image, refine_row
+from mock_data import page_numbers as known_page_numbers
+from page_layout import group_lines, layout_stamp, load_layout
+from pipeline import run_pipeline
+
 # 配置
 SOURCE_DIR = Path("/Users/youyou/Downloads/M压轴/packages/图片")
 OUTPUT_DIR = Path("/Users/youyou/Downloads/M压轴/packages/提取图形")
 
-def find_figure_regions(image_path):
+# 并行进程数，以及流水线中最多同时在途的页面数
+WORKERS = os.cpu_count() or 1
+QUEUE_DEPTH = WORKERS * 2
+
+# 金字塔检测：二值化/膨胀/连通域/水平线检测 在 1/PYRAMID_SCALE 的缩小图上运行，
+# 得到的区域和直线再映射回原图坐标；设为 1 则在全分辨率上检测
+PYRAMID_SCALE = 2
+
+# 检测版本：修改检测逻辑或参数后加一，图形索引中旧版本的包围框将不再复用
+DETECTOR_VERSION = 3
+
+# 重新提取时复用图形索引中内容未变页面的包围框
+REUSE_INDEX = True
+
+# 有页面版面（page_layout.py）时，检测前先把正文文字区域清零，段落不再膨胀成候选块
+# 只遮含汉字的OCR行，图形里的字母、数字标注保留；低于 TEXT_MIN_CONF 的词不遮，四周外扩 TEXT_MARGIN 像素
+TEXT_MASK = True
+TEXT_MIN_CONF = 50
+TEXT_MARGIN = 2
+
+def detector_version(masked):
+    """图形索引中记录的检测版本：遮住文字与未遮住的检测结果分别编号，互不复用"""
+    return DETECTOR_VERSION * 2 + int(masked)
+
+def text_boxes(layout, min_conf=TEXT_MIN_CONF):
+    """
+    从页面版面中取出正文文字的词框
+    返回: [[x, y, w, h], ...] 整数数组（原图坐标）
+    """
+    rows = []
+    for words in group_lines(layout):
+        words = [i for i in words if layout['level'][i] == 5]
+        if not any('\u4e00' <= ch <= '\u9fff' for i in words for ch in layout['text'][i]):
+            continue
+        rows += [[layout['left'][i], layout['top'][i], layout['width'][i], layout['height'][i]]
+                 for i in words if layout['conf'][i] >= min_conf]
+    return np.array(rows, dtype=np.int64).reshape(-1, 4)
+
+def mask_text(binary, boxes, scale=1, margin=TEXT_MARGIN):
+    """把词框区域（原图坐标）在 1/scale 的二值图上清零（原地修改）"""
+    x0 = np.maximum((boxes[:, 0] - margin) // scale, 0)
+    y0 = np.maximum((boxes[:, 1] - margin) // scale, 0)
+    x1 = -((-(boxes[:, 0] + boxes[:, 2] + margin)) // scale)
+    y1 = -((-(boxes[:, 1] + boxes[:, 3] + margin)) // scale)
+    for a, b, c, d in zip(y0, y1, x0, x1):
+        binary[a:b, c:d] = 0
+    return binary
+
+# 笔画方向直方图：墨迹边缘的笔画方向按偏离水平方向的角度(0~90度)每 ANGLE_STEP 度一档
+ANGLE_STEP = 10
+ANGLE_BINS = 90 // ANGLE_STEP
+
+# 偏离水平、竖直方向都超过 DIAGONAL_MIN 度的笔画视为斜线；
+# 斜线边缘占比达到 DIAGONAL_RATIO 的连通域（三角形、带对角线的四边形、圆等）归为几何图形
+DIAGONAL_MIN = 20
+DIAGONAL_RATIO = 0.3
+
+# 梯度（模糊后的墨迹图，0~1）超过此值的墨迹像素视为边缘
+EDGE_GRADIENT = 0.5
+
+def stroke_angles(binary, labels, count):
+    """
+    一次性统计所有连通域的笔画方向直方图
+    在墨迹边缘上用 Sobel 梯度求方向（梯度与笔画垂直），再按 连通域×角度档 做一次 bincount
+    返回: (count, ANGLE_BINS) 数组，每行为该连通域边缘像素在各角度档中的占比
+    """
+    # 先模糊再求梯度，避免二值图锯齿把斜线都量成 0/45/90 度
+    ink = cv2.GaussianBlur(binary.astype(np.float32) / 255, (5, 5), 0)
+    gx = cv2.Sobel(ink, cv2.CV_32F, 1, 0, ksize=3)
+    gy = cv2.Sobel(ink, cv2.CV_32F, 0, 1, ksize=3)
+    edge = (binary > 0) & (np.abs(gx) + np.abs(gy) > EDGE_GRADIENT)
+    # 梯度竖直（gx=0）对应水平笔画，角度为0；梯度水平对应竖直笔画，角度为90
+    angle = np.degrees(np.arctan2(np.abs(gx[edge]), np.abs(gy[edge])))
+    bins = np.minimum((angle // ANGLE_STEP).astype(np.int64), ANGLE_BINS - 1)
+    hist = np.bincount(labels[edge].astype(np.int64) * ANGLE_BINS + bins,
+                       minlength=count * ANGLE_BINS).reshape(count, ANGLE_BINS).astype(float)
+    return hist / np.maximum(hist.sum(axis=1, keepdims=True), 1)
+
+def component_stats(binary, dilated, scale=1):
+    """
+    对膨胀后的二值图做一次连通域标记，并计算每个连通域的统计特征
+    binary: 膨胀前的墨迹图，用于统计墨迹量和长笔画
+    返回: (stats, features)，stats 为 connectedComponentsWithStats 的 [x, y, w, h, area]，
+          features 为每个连通域的 [墨迹密度, 水平长笔画占比, 竖直长笔画占比, 斜线占比, 笔画方向直方图...]，
+          均不含背景(0号)
+    """
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(dilated, connectivity=8)
+    
+    # 水平/竖直方向的长笔画（游程长度超过 run 像素）
+    run = max(5, 30 // scale)
+    horizontal = cv2.morphologyEx(binary, cv2.MORPH_OPEN, np.ones((1, run), np.uint8))
+    vertical = cv2.morphologyEx(binary, cv2.MORPH_OPEN, np.ones((run, 1), np.uint8))
+    
+    # 一次 bincount 得到所有连通域的墨迹量
+    ink = np.bincount(labels[binary > 0], minlength=count).astype(float)
+    h_ink = np.bincount(labels[horizontal > 0], minlength=count)
+    v_ink = np.bincount(labels[vertical > 0], minlength=count)
+    
+    box_area = stats[:, cv2.CC_STAT_WIDTH] * stats[:, cv2.CC_STAT_HEIGHT]
+    safe_ink = np.maximum(ink, 1)
+    angles = stroke_angles(binary, labels, count)
+    lo, hi = DIAGONAL_MIN // ANGLE_STEP, ANGLE_BINS - DIAGONAL_MIN // ANGLE_STEP
+    diagonal = angles[:, lo:hi].sum(axis=1)
+    features = np.column_stack([ink / np.maximum(box_area, 1), h_ink / safe_ink, v_ink / safe_ink,
+                                diagonal, angles])
+    return stats[1:, :5], features[1:]
+
+def classify_components(features):
+    """
+    按连通域特征批量判断图形类型
+    features: component_stats 返回的特征数组 [墨迹密度, 水平长笔画占比, 竖直长笔画占比, 斜线占比, ...]
+    """
+    density, h_frac, v_frac, diagonal = features[:, 0], features[:, 1], features[:, 2], features[:, 3]
+    # 几乎只有水平/竖直笔画时，长笔画占比才能决定是表格还是数轴
+    straight = diagonal < DIAGONAL_RATIO
+    
+    # 按优先级从低到高依次覆盖：稀疏或斜线多的线条图为几何图形，
+    # 只有水平/竖直笔画特征明确时才改判，三角形的底边、矩形的边框不再决定类型
+    types = np.full(len(features), 'shape', dtype=object)
+    types[(density < 0.08) | ~straight] = 'geometry'  # 几何图形
+    types[straight & (h_frac > 0.15) & (v_frac > 0.15)] = 'table'  # 表格
+    types[straight & (h_frac > 0.3) & (v_frac < 0.05)] = 'number_line'  # 数轴
+    return types
+
+def find_figure_regions(page, scale=PYRAMID_SCALE, text=None):
     """
     检测图片中的图形区域
+    一次连通域标记得到所有候选区域及其特征，过滤和分类都是批量的数组运算，
+    不再对每个候选区域单独做霍夫变换
+    page: Page 对象或图片路径
+    scale: 在 1/scale 的缩小图上检测，返回的坐标已映射回原图
+    text: 正文词框数组（见 text_boxes），膨胀前先把这些区域清零
     返回: [(x, y, w, h, type), ...] 图形区域列表
     """
-    img = cv2.imread(str(image_path))
-    if img is None:
-        return []
-    
-    height, width = img.shape[:2]
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    page = as_page(page)
+    height, width = page.height, page.width
+    gray = page.small(scale)
     
     # 二值化
-    _, binary = cv2.threshold(gray, 240, 255, cv2.THRESH_BINARY_INV)
-    
-    # 形态学操作，连接相近的元素
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 15))
-    dilated = cv2.dilate(binary, kernel, iterations=2)
+    if scale <= 1:
+        binary = page.binary(240)
+    else:
+        _, binary = cv2.threshold(gray, 240, 255, cv2.THRESH_BINARY_INV)
     
-    # 查找轮廓
-    contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    # 遮住正文文字（不修改 Page 缓存的二值图）
+    if text is not None and len(text):
+        binary = mask_text(binary.copy(), text, scale)
     
-    figures = []
-    min_area = width * height * 0.01  # 最小面积阈值（1%）
-    max_area = width * height * 0.5   # 最大面积阈值（50%）
+    # 形态学操作，连接相近的元素（核大小随分辨率缩小）
+    k = max(3, 15 // scale)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (k, k))
+    dilated = cv2.dilate(binary, kernel, iterations=2)
     
-    for contour in contours:
-        x, y, w, h = cv2.boundingRect(contour)
-        area = w * h
-        
-        # 过滤太小或太大的区域
-        if area < min_area or area > max_area:
-            continue
-        
-        # 过滤太窄的区域（可能是文字行）
-        aspect_ratio = w / h if h > 0 else 0
-        if aspect_ratio > 10 or aspect_ratio < 0.1:
-            continue
-        
-        # 检测图形类型
-        fig_type = detect_figure_type(gray[y:y+h, x:x+w])
-        
-        figures.append({
-            'x': x, 'y': y, 'w': w, 'h': h,
-            'type': fig_type,
-            'area': area
-        })
+    stats, features = component_stats(binary, dilated, scale)
+    
+    # 映射回原图坐标
+    x = stats[:, 0] * scale
+    y = stats[:, 1] * scale
+    w = np.minimum(stats[:, 2] * scale, width - x)
+    h = np.minimum(stats[:, 3] * scale, height - y)
+    area = w * h
+    
+    # 过滤太小或太大的区域（1%~50%），以及太窄的区域（可能是文字行）
+    aspect_ratio = w / np.maximum(h, 1)
+    keep = ((area >= width * height * 0.01) & (area <= width * height * 0.5)
+            & (aspect_ratio <= 10) & (aspect_ratio >= 0.1))
+    
+    # 去掉完全落在其它候选区域内部的连通域（例如表格格子里的文字）
+    idx = np.flatnonzero(keep)
+    x0, y0, x1, y1 = x[idx], y[idx], x[idx] + w[idx], y[idx] + h[idx]
+    inside = ((x0[:, None] >= x0[None, :]) & (y0[:, None] >= y0[None, :])
+              & (x1[:, None] <= x1[None, :]) & (y1[:, None] <= y1[None, :]))
+    np.fill_diagonal(inside, False)
+    idx = idx[~inside.any(axis=1)]
+    
+    types = classify_components(features[idx])
+    
+    # 墨迹落在长笔画上的比例越高，越像图形而不是文字
+    confidence = np.clip((features[idx, 1] + features[idx, 2]) * 2, 0, 1)
+    
+    figures = [{
+        'x': int(x[i]), 'y': int(y[i]), 'w': int(w[i]), 'h': int(h[i]),
+        'type': fig_type,
+        'area': int(area[i]),
+        'detector': 'components',
+        'confidence': float(conf)
+    } for i, fig_type, conf in zip(idx, types, confidence)]
     
     # 按y坐标排序
     figures.sort(key=lambda f: f['y'])
     
     return figures
 
-def detect_figure_type(roi):
+def extract_number_line(page, output_dir, scale=PYRAMID_SCALE):
     """
-    检测图形类型
+    专门提取数轴图形
+    page: Page 对象或图片路径
+    scale: 在 1/scale 的缩小图上检测长水平线作为轴线候选，轴线所在行再回到原图精确定位
     """
-    if roi.size == 0:
-        return 'unknown'
+    page = as_page(page)
+    height, width = page.height, page.width
+    gray = page.small(scale)
     
-    # 边缘检测
-    edges = cv2.Canny(roi, 50, 150)
-    
-    # 霍夫线变换检测直线
-    lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=50, 
-                            minLineLength=30, maxLineGap=10)
-    
-    if lines is None:
-        return 'shape'
-    
-    # 分析线条角度
-    horizontal_count = 0
-    vertical_count = 0
+    number_lines = []
     
-    for line in lines:
-        x1, y1, x2, y2 = line[0]
-        angle = np.arctan2(y2 - y1, x2 - x1) * 180 / np.pi
+    for rule in find_horizontal_rules(gray, gray.shape[1] * 0.3):
+        x1, x2 = rule['x'] * scale, (rule['x'] + rule['length']) * scale
+        # 扩展区域以包含刻度和标签
+        y_center = rule['y'] * scale
+        if scale > 1:
+            y_center = refine_row(page, y_center, 2 * scale, x1, x2)
+        y_top = max(0, y_center - 60)
+        y_bottom = min(height, y_center + 40)
+        x_left = max(0, x1 - 20)
+        x_right = min(width, x2 + 20)
         
-        if abs(angle) < 10 or abs(angle) > 170:
-            horizontal_count += 1
-        elif 80 < abs(angle) < 100:
-            vertical_count += 1
-    
-    # 判断图形类型
-    if horizontal_count > 3 and vertical_count < 2:
-        return 'number_line'  # 数轴
-    elif horizontal_count > 2 and vertical_count > 2:
-        return 'table'  # 表格
-    elif len(lines) > 5:
-        return 'geometry'  # 几何图形
-    else:
-        return 'shape'
+        number_lines.append({
+            'x': int(x_left),
+            'y': int(y_top),
+            'w': int(x_right - x_left),
+            'h': int(y_bottom - y_top),
+            'type': 'number_line',
+            'detector': 'rule',
+            # 轴线越长越可信
+            'confidence': min(1.0, (x2 - x1) / (width * 0.6))
+        })
+    
+    return number_lines
 
-def extract_number_line(image_path, output_dir):
+# 合并时各检测器的优先级（数字越小越优先保留）
+DETECTOR_PRIORITY = {'components': 0, 'rule': 1}
+
+def merge_boxes(figures, overlap=0.5):
     """
-    专门提取数轴图形
+    向量化的重叠框合并（非极大值抑制）
+    候选框按 检测器优先级 → 面积从大到小 → y → x 排序，结果与输入顺序无关；
+    依次保留排在最前的框，与它的交集超过较小框面积 overlap 的其它框被并入：
+    同类型的框取并集（例如同一条数轴的多段线段），不同类型的直接丢弃。
+    每保留一个框只做一次 O(n) 的数组运算，数千个候选框也能快速处理。
+    返回: 合并后的图形列表，按 (y, x) 排序
     """
-    img = cv2.imread(str(image_path))
-    if img is None:
+    if not figures:
         return []
     
-    height, width = img.shape[:2]
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    
-    # 边缘检测
-    edges = cv2.Canny(gray, 50, 150)
-    
-    # 检测水平线
-    lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=100,
-                            minLineLength=width*0.3, maxLineGap=20)
-    
-    number_lines = []
-    
-    if lines is not None:
-        for line in lines:
-            x1, y1, x2, y2 = line[0]
-            # 检查是否为水平线
-            if abs(y2 - y1) < 10:
-                # 扩展区域以包含刻度和标签
-                y_center = (y1 + y2) // 2
-                y_top = max(0, y_center - 60)
-                y_bottom = min(height, y_center + 40)
-                x_left = max(0, min(x1, x2) - 20)
-                x_right = min(width, max(x1, x2) + 20)
-                
-                number_lines.append({
-                    'x': x_left,
-                    'y': y_top,
-                    'w': x_right - x_left,
-                    'h': y_bottom - y_top,
-                    'type': 'number_line'
-                })
-    
-    return number_lines
+    x0 = np.array([f['x'] for f in figures], dtype=np.int64)
+    y0 = np.array([f['y'] for f in figures], dtype=np.int64)
+    x1 = x0 + np.array([f['w'] for f in figures], dtype=np.int64)
+    y1 = y0 + np.array([f['h'] for f in figures], dtype=np.int64)
+    area = (x1 - x0) * (y1 - y0)
+    priority = np.array([DETECTOR_PRIORITY.get(f.get('detector'), len(DETECTOR_PRIORITY))
+                         for f in figures])
+    types = np.array([f['type'] for f in figures], dtype=object)
+    
+    order = np.lexsort((x0, y0, -area, priority))
+    alive = np.ones(len(figures), dtype=bool)
+    merged = []
+    
+    for i in order:
+        if not alive[i]:
+            continue
+        alive[i] = False
+        rest = np.flatnonzero(alive)
+        
+        iw = np.clip(np.minimum(x1[i], x1[rest]) - np.maximum(x0[i], x0[rest]), 0, None)
+        ih = np.clip(np.minimum(y1[i], y1[rest]) - np.maximum(y0[i], y0[rest]), 0, None)
+        covered = rest[iw * ih > overlap * np.minimum(area[i], area[rest])]
+        alive[covered] = False
+        
+        # 同类型的重叠框并入当前框
+        same = np.append(covered[types[covered] == types[i]], i)
+        bx0, by0 = int(x0[same].min()), int(y0[same].min())
+        bx1, by1 = int(x1[same].max()), int(y1[same].max())
+        fig = dict(figures[i])
+        fig.update({'x': bx0, 'y': by0, 'w': bx1 - bx0, 'h': by1 - by0,
+                    'area': (bx1 - bx0) * (by1 - by0)})
+        merged.append(fig)
+    
+    merged.sort(key=lambda f: (f['y'], f['x']))
+    return merged
 
-def extract_all_figures(image_path, output_dir, filename_prefix):
+def process_page(image_path, data, output_dir, filename_prefix=None):
     """
-    从图片中提取所有图形
+    流水线工作进程中执行的单页任务：检测图形并编码为PNG
+    页面内容和检测版本都未变时，直接复用图形索引中的包围框
+    有页面版面时先遮住正文文字再检测
+    返回: ((页面哈希, 图形列表, 检测版本), [(输出路径, 字节), ...])，图形中含输出文件名和内容哈希
     """
-    img = Image.open(image_path)
-    
-    # 方法1: 通用图形检测
-    figures = find_figure_regions(image_path)
-    
-    # 方法2: 专门检测数轴
-    number_lines = extract_number_line(image_path, output_dir)
-    
-    # 合并结果，去重
-    all_figures = figures + number_lines
-    
-    # 去除重叠区域
-    filtered_figures = []
-    for fig in all_figures:
-        is_duplicate = False
-        for existing in filtered_figures:
-            # 检查重叠
-            overlap_x = max(0, min(fig['x']+fig['w'], existing['x']+existing['w']) - max(fig['x'], existing['x']))
-            overlap_y = max(0, min(fig['y']+fig['h'], existing['y']+existing['h']) - max(fig['y'], existing['y']))
-            overlap_area = overlap_x * overlap_y
-            
-            if overlap_area > fig['w'] * fig['h'] * 0.5:
-                is_duplicate = True
-                break
+    page = Page(image_path, data)
+    layout = load_layout(page) if TEXT_MASK else None
+    version = detector_version(layout is not None)
+    
+    filtered_figures = get_index().boxes(page.sha256, version) if REUSE_INDEX else None
+    if filtered_figures is None:
+        # 方法1: 通用图形检测
+        figures = find_figure_regions(page, text=None if layout is None else text_boxes(layout))
+        
+        # 方法2: 专门检测数轴
+        number_lines = extract_number_line(page, output_dir)
         
-        if not is_duplicate:
-            filtered_figures.append(fig)
+        # 合并结果，去重
+        filtered_figures = merge_boxes(figures + number_lines)
     
-    # 保存提取的图形
-    saved_files = []
+    # 编码提取的图形
+    outputs = []
     for i, fig in enumerate(filtered_figures):
-        # 裁剪图形
-        cropped = img.crop((fig['x'], fig['y'], 
-                           fig['x'] + fig['w'], fig['y'] + fig['h']))
-        
-        # 添加白色边距
-        padded = Image.new('RGB', (fig['w'] + 20, fig['h'] + 20), 'white')
-        padded.paste(cropped, (10, 10))
+        # 裁剪图形（原图视图）并添加白色边距，直接编码为PNG字节
+        padded = page.crop(fig['y'], fig['y'] + fig['h'], fig['x'], fig['x'] + fig['w'], pad=10)
+        png = encode_image(padded, '.png')
         
-        # 保存
-        output_name = f"{filename_prefix}_fig{i+1}_{fig['type']}.png"
-        output_path = output_dir / output_name
-        padded.save(output_path)
-        saved_files.append(output_path)
+        output_name = f"{filename_prefix or page.path.stem}_fig{i+1}_{fig['type']}.png"
+        outputs.append((output_dir / output_name, png))
+        fig['file'] = output_name
+        fig['content_hash'] = hashlib.sha256(png).hexdigest()
     
+    return (page.sha256, filtered_figures, version), outputs
+
+def extract_all_figures(image_path, output_dir, filename_prefix=None):
+    """
+    从图片中提取所有图形并保存
+    返回: 保存的文件路径列表
+    """
+    _, outputs = process_page(image_path, None, output_dir, filename_prefix)
+    saved_files = []
+    for path, data in outputs:
+        path.write_bytes(data)
+        saved_files.append(path)
     return saved_files
 
 def main():
@@ -220,25 +371,49 @@ def main():
     
     # 获取所有图片
     image_files = sorted(SOURCE_DIR.glob("*.jpg"))
-    total = len(image_files)
     
-    print(f"\n找到 {total} 张图片")
+    # 增量构建：跳过输入、页面版面和脚本都未变化的页面
+    params = {"text_mask": [TEXT_MASK, TEXT_MIN_CONF, TEXT_MARGIN]}
+    manifest = Manifest(OUTPUT_DIR, params, code=local_modules(__file__))
+    removed = manifest.prune(image_files)
+    deps = {p: layout_stamp(p) if TEXT_MASK else None for p in image_files}
+    pending = [p for p in image_files if not manifest.is_fresh(p, deps[p])]
+    total = len(pending)
+    
+    print(f"\n找到 {len(image_files)} 张图片，其中 {total} 张需要处理（{len(image_files) - total} 张未变化）")
+    if removed:
+        print(f"已删除 {removed} 个过期文件")
     print("-" * 60)
     
+    # 图形索引：页码取自 mock-data.ts 的 pageNumber，其余按扫描顺序推算
+    index = get_index()
+    index.remove_missing(image_files)
+    page_numbers = book_page_numbers(image_files, known_page_numbers())
+    index.renumber(page_numbers)
+    
     total_figures = 0
+    process = partial(process_page, output_dir=OUTPUT_DIR)
     
-    for i, img_path in enumerate(image_files, 1):
-        print(f"[{i}/{total}] {img_path.name}", end=" ")
-        
-        prefix = img_path.stem
-        figures = extract_all_figures(img_path, OUTPUT_DIR, prefix)
-        
-        print(f"✅ 提取了 {len(figures)} 个图形")
-        total_figures += len(figures)
+    try:
+        for i, img_path, info, written, error in run_pipeline(pending, process, WORKERS, QUEUE_DEPTH):
+            print(f"[{i + 1}/{total}] {img_path.name}", end=" ")
+            
+            if error:
+                print(f"❌ 失败: {error}")
+                continue
+            manifest.record(img_path, written, deps[img_path])
+            page_hash, figures, version = info
+            index.replace_page(img_path.name, page_numbers[img_path], page_hash, figures, version)
+            
+            print(f"✅ 提取了 {len(written)} 个图形")
+            total_figures += len(written)
+    finally:
+        manifest.save()
     
     print("-" * 60)
     print(f"\n✅ 完成！共提取 {total_figures} 个图形")
     print(f"输出目录: {OUTPUT_DIR}")
+    print(f"图形索引: {index.path}")
 
 if __name__ == "__main__":
     main()
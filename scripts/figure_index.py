@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+图形区域索引 - 把 extract_figures 检测到的每个图形的几何信息存入SQLite
+记录页面、书中页码、包围框、类型、检测器、置信度和内容哈希，下游无需重新检测或解析文件名。
+重新提取时，页面内容和检测版本都未变的页面直接复用已存的包围框。
+
+用法:
+  python3 figure_index.py --type number_line --pages 6-20
+  python3 figure_index.py --overlaps 100,200,400,300 --page 101766031408_.pic.jpg
+"""
+
+import argparse
+import re
+import sqlite3
+from pathlib import Path
+
+from process_local import process_local
+
+# 配置
+INDEX_PATH = Path("/Users/youyou/Downloads/M压轴/packages/提取图形/figures.sqlite")
+
+FIELDS = ['page', 'page_no', 'page_hash', 'idx', 'x', 'y', 'w', 'h',
+          'type', 'detector', 'confidence', 'content_hash', 'file', 'version']
+
+def scan_order(path):
+    """扫描页的自然排序键：按文件名开头的数字大小（91766031407_ 排在 101766031408_ 之前）"""
+    name = Path(path).name
+    prefix = re.match(r'\d+', name)
+    return (int(prefix.group()) if prefix else float('inf'), name)
+
+def book_page_numbers(paths, known):
+    """
+    给每张扫描页分配书中页码
+    known: 已知页码 {文件名: 页码}（mock-data.ts 的 pageNumber）
+    未知页码的页面按扫描顺序从前面最近的已知页面顺推；前面没有已知页面时从后面倒推，
+    一个都不知道时退回扫描顺序中的位置（从1开始）
+    返回: {路径: 页码}
+    """
+    ordered = sorted(paths, key=scan_order)
+    anchors = [(i, known[p.name]) for i, p in enumerate(ordered) if p.name in known]
+    numbers = {}
+    for i, p in enumerate(ordered):
+        if p.name in known:
+            numbers[p] = known[p.name]
+            continue
+        before = [(j, n) for j, n in anchors if j < i]
+        j, n = before[-1] if before else (anchors[0] if anchors else (-1, 0))
+        numbers[p] = n + i - j
+    return numbers
+
+class FigureIndex:
+    """图形区域索引，page_no 为书中页码（见 book_page_numbers）"""
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), timeout=30)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS figures (
+                page         TEXT NOT NULL,
+                page_no      INTEGER NOT NULL,
+                page_hash    TEXT NOT NULL,
+                idx          INTEGER NOT NULL,
+                x            INTEGER NOT NULL,
+                y            INTEGER NOT NULL,
+                w            INTEGER NOT NULL,
+                h            INTEGER NOT NULL,
+                type         TEXT NOT NULL,
+                detector     TEXT NOT NULL,
+                confidence   REAL NOT NULL,
+                content_hash TEXT NOT NULL,
+                file         TEXT NOT NULL,
+                version      INTEGER NOT NULL,
+                PRIMARY KEY (page, idx)
+            );
+            CREATE INDEX IF NOT EXISTS figures_type_page ON figures (type, page_no);
+            CREATE INDEX IF NOT EXISTS figures_page_hash ON figures (page_hash);
+            CREATE TABLE IF NOT EXISTS pages (
+                page      TEXT PRIMARY KEY,
+                page_hash TEXT NOT NULL,
+                version   INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pages_page_hash ON pages (page_hash, version);
+        """)
+        self.db.commit()
+
+    def replace_page(self, page, page_no, page_hash, figures, version):
+        """用新的检测结果替换某页的全部记录；没有图形的页面也记录下来，下次同样直接复用"""
+        rows = [(page, page_no, page_hash, i, f['x'], f['y'], f['w'], f['h'],
+                 f['type'], f['detector'], f['confidence'], f['content_hash'], f['file'], version)
+                for i, f in enumerate(figures, 1)]
+        with self.db:
+            self.db.execute("DELETE FROM figures WHERE page = ?", (page,))
+            self.db.executemany(f"INSERT INTO figures VALUES ({', '.join('?' * len(FIELDS))})", rows)
+            self.db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?)", (page, page_hash, version))
+
+    def renumber(self, page_numbers):
+        """更新页码（未重新检测的页面也要跟着页码来源的变化更新）"""
+        with self.db:
+            self.db.executemany("UPDATE figures SET page_no = ? WHERE page = ?",
+                                [(n, Path(p).name) for p, n in page_numbers.items()])
+
+    def remove_missing(self, pages):
+        """删除源目录中已不存在的页面"""
+        names = {Path(p).name for p in pages}
+        stale = [row[0] for row in self.db.execute(
+                     "SELECT page FROM pages UNION SELECT DISTINCT page FROM figures")
+                 if row[0] not in names]
+        with self.db:
+            self.db.executemany("DELETE FROM figures WHERE page = ?", [(p,) for p in stale])
+            self.db.executemany("DELETE FROM pages WHERE page = ?", [(p,) for p in stale])
+
+    def boxes(self, page_hash, version):
+        """
+        按页面内容哈希取已存的包围框，用于跳过重新检测
+        内容相同的页面（例如重复的扫描）可能有多页记录，只取其中一页的，否则包围框会成倍增加
+        返回: 图形列表（没有图形的页面为空列表）；没有记录或检测版本不同返回None
+        """
+        source = self.db.execute(
+            "SELECT page FROM pages WHERE page_hash = ? AND version = ? LIMIT 1",
+            (page_hash, version)).fetchone()
+        if source is None:
+            return None
+        rows = self.db.execute(
+            "SELECT * FROM figures WHERE page = ? ORDER BY idx", (source[0],)).fetchall()
+        return [{k: row[k] for k in ('x', 'y', 'w', 'h', 'type', 'detector', 'confidence')}
+                for row in rows]
+
+    def query(self, fig_type=None, pages=None, overlaps=None, page=None):
+        """
+        查询图形
+        fig_type: 图形类型，例如 'number_line'
+        pages: (起始页码, 结束页码)，闭区间
+        overlaps: (x, y, w, h)，返回与该矩形相交的图形
+        page: 页面文件名
+        """
+        where, args = [], []
+        if fig_type:
+            where.append("type = ?")
+            args.append(fig_type)
+        if pages:
+            where.append("page_no BETWEEN ? AND ?")
+            args += list(pages)
+        if overlaps:
+            x, y, w, h = overlaps
+            where.append("x < ? AND x + w > ? AND y < ? AND y + h > ?")
+            args += [x + w, x, y + h, y]
+        if page:
+            where.append("page = ?")
+            args.append(page)
+        sql = "SELECT * FROM figures"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY page_no, idx"
+        return [dict(row) for row in self.db.execute(sql, args)]
+
+_index = process_local(lambda: FigureIndex(INDEX_PATH))
+
+def get_index():
+    """返回当前进程的索引连接（首次调用时打开）"""
+    return _index()
+
+def main():
+    parser = argparse.ArgumentParser(description="查询图形区域索引")
+    parser.add_argument('--type', dest='fig_type', help="图形类型，例如 number_line")
+    parser.add_argument('--pages', help="书中页码范围，例如 6-20")
+    parser.add_argument('--overlaps', help="与矩形 x,y,w,h 相交的图形")
+    parser.add_argument('--page', help="页面文件名")
+    args = parser.parse_args()
+
+    pages = tuple(int(p) for p in args.pages.split('-')) if args.pages else None
+    if pages and len(pages) == 1:
+        pages = pages * 2
+    overlaps = tuple(int(v) for v in args.overlaps.split(',')) if args.overlaps else None
+
+    results = get_index().query(args.fig_type, pages, overlaps, args.page)
+    for r in results:
+        print(f"#{r['page_no']:<4} {r['page']}  fig{r['idx']}  {r['type']:<12} "
+              f"({r['x']}, {r['y']}, {r['w']}, {r['h']})  {r['detector']} {r['confidence']:.2f}  {r['file']}")
+    print(f"共 {len(results)} 个图形")
+
+if __name__ == "__main__":
+    main()
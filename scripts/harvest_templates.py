@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+标题模板采集 - 从已有页面中截取"针对训练"标题，作为 smart_crop 模板匹配的模板
+用OCR（优先读缓存）在关键词区域找到完整的"针对训练"，按词框外扩几像素截取灰度图，
+保存到 smart_crop.TEMPLATE_DIR。同一本书的标题字体、字号一致，采集两三张即可。
+
+用法:
+  python3 harvest_templates.py --count 3
+  python3 harvest_templates.py --source 图片目录 --count 2
+"""
+
+import argparse
+from pathlib import Path
+
+from ocr_cache import cached_image_to_data
+from page_image import Page, encode_image
+from smart_crop import OCR_KEYWORDS, SOURCE_DIR, TEMPLATE_DIR, find_keyword_box, keyword_band
+
+# 截取时在词框四周外扩的像素
+MARGIN = 4
+
+def harvest(page, margin=MARGIN):
+    """
+    在页面的关键词区域中找完整的标题
+    返回: 标题的全分辨率灰度图，未找到返回None
+    """
+    top, bottom = keyword_band(page)
+    box, _ = find_keyword_box(cached_image_to_data(page, top, bottom), OCR_KEYWORDS[:1])
+    if box is None:
+        return None
+    left, y0, right, y1 = box
+    return page.gray_rows(max(0, top + y0 - margin), min(page.height, top + y1 + margin))[
+        :, max(0, left - margin):right + margin]
+
+def main():
+    parser = argparse.ArgumentParser(description="采集标题模板")
+    parser.add_argument('--source', type=Path, default=SOURCE_DIR, help="页面图片目录")
+    parser.add_argument('--count', type=int, default=3, help="采集的模板数量")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🔖 标题模板采集")
+    print("=" * 60)
+    print(f"源目录: {args.source}")
+    print(f"模板目录: {TEMPLATE_DIR}")
+    print("-" * 60)
+
+    TEMPLATE_DIR.mkdir(parents=True, exist_ok=True)
+    keyword = OCR_KEYWORDS[0]
+    existing = len(list(TEMPLATE_DIR.glob(f"{keyword}_*.png")))
+    saved = 0
+    for path in sorted(args.source.glob("*.jpg")):
+        if saved >= args.count:
+            break
+        header = harvest(Page(path))
+        if header is None:
+            continue
+        out = TEMPLATE_DIR / f"{keyword}_{existing + saved + 1:02d}.png"
+        out.write_bytes(encode_image(header, '.png'))
+        saved += 1
+        print(f"✅ {path.name} -> {out.name} ({header.shape[1]}x{header.shape[0]})")
+
+    print("-" * 60)
+    print(f"共采集 {saved} 个模板")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+响应式图片衍生 - 为 app 用到的每张图片生成多种宽度、多种格式的版本
+来源: mock-data.ts 中引用的扫描页，以及 extract_figures.py 提取出的图形PNG
+每张图片按 WIDTHS 缩小（不放大），每个宽度输出 AVIF、WebP 以及与原图相同类型的格式
+（扫描页为JPEG，图形为PNG），供不支持新格式的客户端回退。
+所有版本的尺寸和字节数写入清单 derivatives.json，Next/Expo 端按设备宽度和支持的格式
+选择最小的合适版本，移动端不必再下载原始分辨率的整页扫描。
+
+用法:
+  python3 image_derivatives.py
+"""
+
+import io
+import json
+import os
+from functools import partial
+from pathlib import Path
+
+from PIL import Image, features
+
+from build_manifest import Manifest, local_modules, write_json
+from mock_data import MOCK_DATA, referenced_pages
+from pipeline import run_pipeline
+
+# 配置
+PAGE_DIR = Path("/Users/youyou/Downloads/M压轴/packages/图片")
+FIGURE_DIR = Path("/Users/youyou/Downloads/M压轴/packages/提取图形")
+OUTPUT_DIR = Path("/Users/youyou/Downloads/M压轴/packages/响应式图片")
+MAPPING_NAME = "derivatives.json"
+
+# 并行进程数，以及流水线中最多同时在途的图片数
+WORKERS = os.cpu_count() or 1
+QUEUE_DEPTH = WORKERS * 2
+
+# 输出宽度（像素）；比原图宽的档位跳过，原图比最小档还窄时只按原宽输出一份
+WIDTHS = (480, 960, 1600)
+
+# 各格式的编码参数；AVIF 需要 Pillow 带 libavif，没有时自动跳过
+FORMATS = {
+    'avif': {'quality': 55, 'speed': 6},
+    'webp': {'quality': 78, 'method': 4},
+    'jpeg': {'quality': 82, 'optimize': True, 'progressive': True},
+    'png': {'optimize': True},
+}
+MODERN_FORMATS = [fmt for fmt in ('avif', 'webp') if features.check(fmt)]
+
+# 扩展名 -> 回退格式（与原图同类型）
+FALLBACK = {'.jpg': 'jpeg', '.png': 'png'}
+SUFFIXES = {'avif': '.avif', 'webp': '.webp', 'jpeg': '.jpg', 'png': '.png'}
+
+def target_widths(width, widths=None):
+    """原图宽度为 width 时要输出的宽度，从小到大；原图比最大档窄时最后一档就是原宽"""
+    widths = widths or WIDTHS
+    result = [w for w in widths if w < width]
+    return result + [width] if len(result) < len(widths) else result
+
+def encode(img, fmt):
+    """用 PIL 把图片编码为指定格式，返回字节"""
+    buf = io.BytesIO()
+    img.save(buf, format=fmt.upper(), **FORMATS[fmt])
+    return buf.getvalue()
+
+def process_image(image_path, data, output_dir):
+    """
+    流水线工作进程中执行的单图任务：生成所有宽度和格式的版本
+    返回: (清单记录, [(输出路径, 字节), ...])
+    """
+    image_path = Path(image_path)
+    fallback = FALLBACK[image_path.suffix.lower()]
+    img = Image.open(io.BytesIO(data))
+    width, height = img.size
+    widths = target_widths(width)
+
+    # JPEG直接按DCT缩放解码到不小于最大目标宽度的尺寸，省去全分辨率解码
+    img.draft('RGB', (widths[-1], height * widths[-1] // width))
+    if fallback == 'jpeg' or img.mode not in ('L', 'RGB', 'RGBA'):
+        img = img.convert('RGB' if fallback == 'jpeg' else 'RGBA')
+
+    variants, outputs = [], []
+    for w in widths:
+        h = max(1, round(height * w / width))
+        resized = img if img.size == (w, h) else img.resize((w, h), Image.LANCZOS, reducing_gap=3.0)
+        for fmt in MODERN_FORMATS + [fallback]:
+            name = f"{image_path.stem}-{w}{SUFFIXES[fmt]}"
+            encoded = encode(resized, fmt)
+            outputs.append((output_dir / name, encoded))
+            variants.append({'file': name, 'format': fmt, 'width': w, 'height': h, 'bytes': len(encoded)})
+
+    info = {'width': width, 'height': height, 'bytes': len(data), 'variants': variants}
+    return info, outputs
+
+def main():
+    print("=" * 60)
+    print("🖼️  响应式图片衍生")
+    print("=" * 60)
+    print(f"扫描页目录: {PAGE_DIR}")
+    print(f"图形目录: {FIGURE_DIR}")
+    print(f"输出目录: {OUTPUT_DIR}")
+    print(f"宽度: {', '.join(map(str, WIDTHS))}  格式: {', '.join(MODERN_FORMATS)} + 原格式")
+    print("=" * 60)
+
+    pages = referenced_pages(MOCK_DATA)
+    sources = {
+        'pages': [PAGE_DIR / name for name in sorted(pages) if (PAGE_DIR / name).exists()],
+        'figures': sorted(FIGURE_DIR.glob("*.png")),
+    }
+    missing = sorted(pages - {p.name for p in sources['pages']})
+    if missing:
+        print(f"⚠️  扫描页目录中缺少 {len(missing)} 张页面: {', '.join(missing)}")
+
+    # 映射文件：保留未变化图片的记录，去掉已不存在的图片
+    mapping_path = OUTPUT_DIR / MAPPING_NAME
+    try:
+        mapping = json.loads(mapping_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        mapping = {}
+    keys = {f"{kind}/{p.name}" for kind, paths in sources.items() for p in paths}
+    mapping = {key: entry for key, entry in mapping.items() if key in keys}
+
+    params = {"widths": WIDTHS, "formats": MODERN_FORMATS, "encoders": FORMATS}
+    success_count = 0
+    fail_count = 0
+    skipped = 0
+    try:
+        for kind, image_files in sources.items():
+            # 每类图片一个子目录、一份增量构建清单
+            output_dir = OUTPUT_DIR / kind
+            output_dir.mkdir(parents=True, exist_ok=True)
+            manifest = Manifest(output_dir, params, code=local_modules(__file__))
+            removed = manifest.prune(image_files)
+            pending = [p for p in image_files if not manifest.is_fresh(p)]
+            total = len(pending)
+            skipped += len(image_files) - total
+
+            print(f"\n{kind}: 找到 {len(image_files)} 张图片，其中 {total} 张需要处理")
+            if removed:
+                print(f"已删除 {removed} 个过期文件")
+            print("-" * 60)
+
+            process = partial(process_image, output_dir=output_dir)
+            try:
+                for i, img_path, info, written, error in run_pipeline(pending, process, WORKERS, QUEUE_DEPTH):
+                    print(f"[{i + 1}/{total}] {img_path.name}", end=" ")
+                    if error:
+                        print(f"❌ 失败: {error}")
+                        fail_count += 1
+                        continue
+                    manifest.record(img_path, written)
+                    for variant in info['variants']:
+                        variant['file'] = f"{kind}/{variant['file']}"
+                    mapping[f"{kind}/{img_path.name}"] = info
+                    smallest = min(v['bytes'] for v in info['variants'])
+                    print(f"✅ {len(info['variants'])} 个版本  "
+                          f"{info['bytes'] / 1024:.0f}KB -> 最小 {smallest / 1024:.0f}KB")
+                    success_count += 1
+            finally:
+                manifest.save()
+    finally:
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        write_json(mapping_path, dict(sorted(mapping.items())))
+
+    # 与原图相比：移动端（最小宽度、最佳格式）需要传输的字节
+    original = sum(entry['bytes'] for entry in mapping.values())
+    mobile = sum(min(v['bytes'] for v in entry['variants']
+                     if v['width'] == entry['variants'][0]['width'])
+                 for entry in mapping.values())
+
+    print("-" * 60)
+    print(f"\n✅ 成功: {success_count} 张")
+    print(f"⏭️  跳过: {skipped} 张（未变化）")
+    print(f"❌ 失败: {fail_count} 张")
+    if original:
+        print(f"\n📉 原图共 {original / 1024 / 1024:.1f}MB，移动端最小版本共 "
+              f"{mobile / 1024 / 1024:.1f}MB（{mobile / original:.0%}）")
+    print(f"\n清单文件: {mapping_path}")
+
+if __name__ == "__main__":
+    main()
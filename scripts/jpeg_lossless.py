@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+无损JPEG分割 - 借助 jpegtran 直接裁剪DCT数据，不解码也不重新编码
+jpegtran 只能在 MCU 行边界（8或16像素）处无损地切出下半部分，
+所以分割点需要先对齐到最近的 MCU 行。
+"""
+
+import io
+import shutil
+import subprocess
+
+from PIL import Image
+
+JPEGTRAN = shutil.which("jpegtran")
+
+def mcu_height(img):
+    """
+    根据JPEG的色度采样因子计算MCU高度
+    img: 已打开（无需解码）的 PIL JpegImageFile
+    """
+    layers = getattr(img, "layer", None) or []
+    if len(layers) <= 1:
+        return 8
+    return 8 * max(v for _, _, v, _ in layers)
+
+def snap_to_mcu(split_point, mcu):
+    """把分割点对齐到最近的MCU边界"""
+    return int(round(split_point / mcu)) * mcu
+
+def _crop(data, width, height, top):
+    """
+    用 jpegtran 切出 [top, top + height) 行
+    -perfect 只拒绝无法变换的边缘块；起点不在MCU边界时 jpegtran 会悄悄上移起点、多带几行，
+    所以不能只看返回码，还要读结果的文件头确认尺寸正好是请求的大小
+    """
+    result = subprocess.run(
+        [JPEGTRAN, "-copy", "all", "-perfect", "-crop", f"{width}x{height}+0+{top}"],
+        input=data, capture_output=True)
+    if result.returncode != 0 or not result.stdout:
+        return None
+    try:
+        size = Image.open(io.BytesIO(result.stdout)).size
+    except OSError:
+        return None
+    return result.stdout if size == (width, height) else None
+
+def split_jpeg(data, width, height, split_y, mcu):
+    """
+    在 split_y 处把JPEG无损地切成上下两部分
+    split_y 必须已对齐到MCU边界（mcu 为 mcu_height() 的结果）
+    返回: (上半部分字节, 下半部分字节)，无法精确地无损分割时返回None，由调用方重新编码
+    """
+    if JPEGTRAN is None or not 0 < split_y < height or split_y % mcu:
+        return None
+    top = _crop(data, width, split_y, 0)
+    bottom = _crop(data, width, height - split_y, split_y) if top else None
+    if top is None or bottom is None:
+        return None
+    return top, bottom
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+题目数据 - 读取 app 的 mock-data.ts 中每道题的 id、images 和 pageNumber
+只用正则按字段解析，不依赖 OpenCV / OCR，裁剪、索引、图片衍生等脚本共用。
+"""
+
+import re
+from pathlib import Path
+
+# 配置
+MOCK_DATA = Path(__file__).resolve().parent.parent / "packages/app/features/problem/mock-data.ts"
+
+def problem_blocks(path=None):
+    """
+    按题目切分 mock-data.ts（默认 MOCK_DATA）
+    返回: [(题目ID, 该题的源码片段), ...]，按出现顺序
+    """
+    text = Path(path or MOCK_DATA).read_text(encoding='utf-8')
+    starts = [(m.start(), m.group(1)) for m in re.finditer(r"^\s{4}id:\s*'([^']+)'", text, re.M)]
+    return [(problem_id, text[pos:starts[k + 1][0] if k + 1 < len(starts) else len(text)])
+            for k, (pos, problem_id) in enumerate(starts)]
+
+def field_images(block):
+    """题目的 images 列表，没有时返回空列表"""
+    images = re.search(r"^\s{4}images:\s*\[([^\]]*)\]", block, re.M)
+    return re.findall(r"'([^']+)'", images.group(1)) if images else []
+
+def field_page_number(block):
+    """题目的 pageNumber，没有时返回None"""
+    number = re.search(r"^\s{4}pageNumber:\s*(\d+)", block, re.M)
+    return int(number.group(1)) if number else None
+
+def referenced_pages(path=None):
+    """images 中引用的扫描页文件名（不含 .svg 等单独配图）"""
+    return {name for _, block in problem_blocks(path) for name in field_images(block)
+            if name.endswith('.jpg')}
+
+def page_numbers(path=None):
+    """
+    扫描页文件名 -> 书中页码（引用该页的题目中最小的 pageNumber）
+    没有任何题目给出 pageNumber 的页面不在结果中
+    """
+    numbers = {}
+    for _, block in problem_blocks(path):
+        number = field_page_number(block)
+        if number is None:
+            continue
+        for name in field_images(block):
+            if name.endswith('.jpg'):
+                numbers[name] = min(numbers.get(name, number), number)
+    return numbers
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+OCR结果缓存 - 以页面内容哈希 + OCR配置 + 区域为键，把 image_to_data 的词框存入SQLite
+重复运行裁剪脚本时直接读取缓存，不再调用 Tesseract。
+批量模式把多个页面的区域竖向拼成一张图，只调用一次 Tesseract，再按y偏移拆回各页并写入缓存。
+直接运行本脚本可查看缓存命中率:  python3 ocr_cache.py
+"""
+
+import json
+import sqlite3
+import time
+from bisect import bisect_right
+from pathlib import Path
+
+import numpy as np
+
+from ocr_engine import OCR_CONFIG, get_engine
+from process_local import process_local
+
+# 配置
+CACHE_PATH = Path("/Users/youyou/Downloads/M压轴/packages/.cache/ocr_cache.sqlite")
+CACHE_MAX_BYTES = 256 * 1024 * 1024  # 超过后按最近最少使用淘汰
+CACHE_ENABLED = True  # 关闭后每次都直接调用OCR（基准测试用）
+BATCH_GAP = 48  # 批量拼接时各区域之间的空白间隔（像素），避免相邻区域的文字被识别成同一行
+
+class OcrCache:
+    """SQLite 持久化的OCR词框缓存，多进程可同时读写"""
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.db = sqlite3.connect(str(self.path), timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS ocr (
+                key       TEXT PRIMARY KEY,
+                data      TEXT NOT NULL,
+                size      INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ocr_last_used ON ocr (last_used);
+            CREATE TABLE IF NOT EXISTS counters (
+                name  TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0);
+        """)
+        self.db.commit()
+
+    @staticmethod
+    def make_key(page_hash, config, roi):
+        return f"{page_hash}|{config}|{','.join(map(str, roi))}"
+
+    def _count(self, name):
+        self.db.execute("UPDATE counters SET value = value + 1 WHERE name = ?", (name,))
+
+    def get(self, page_hash, config, roi):
+        """返回缓存的OCR字典，未命中返回None"""
+        key = self.make_key(page_hash, config, roi)
+        row = self.db.execute("SELECT data FROM ocr WHERE key = ?", (key,)).fetchone()
+        with self.db:
+            if row is None:
+                self._count('misses')
+                return None
+            self._count('hits')
+            self.db.execute("UPDATE ocr SET last_used = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def contains(self, page_hash, config, roi):
+        """是否已有缓存（不计入命中统计）"""
+        key = self.make_key(page_hash, config, roi)
+        return self.db.execute("SELECT 1 FROM ocr WHERE key = ?", (key,)).fetchone() is not None
+
+    def put(self, page_hash, config, roi, data):
+        key = self.make_key(page_hash, config, roi)
+        blob = json.dumps(data, ensure_ascii=False)
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO ocr VALUES (?, ?, ?, ?)",
+                            (key, blob, len(blob), time.time()))
+            self.evict()
+
+    def evict(self):
+        """总大小超过上限时，删除最久未使用的条目"""
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM ocr").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.db.execute("SELECT key, size FROM ocr ORDER BY last_used").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self.db.executemany("DELETE FROM ocr WHERE key = ?", stale)
+
+    def stats(self):
+        entries, size = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr").fetchone()
+        counters = dict(self.db.execute("SELECT name, value FROM counters"))
+        lookups = counters['hits'] + counters['misses']
+        return {
+            'entries': entries,
+            'bytes': size,
+            'hits': counters['hits'],
+            'misses': counters['misses'],
+            'hit_rate': counters['hits'] / lookups if lookups else 0.0,
+        }
+
+_cache = process_local(lambda: OcrCache(CACHE_PATH, CACHE_MAX_BYTES))
+
+def get_cache():
+    """返回当前进程的缓存连接（首次调用时打开）"""
+    return _cache()
+
+def cached_image_to_data(page, top=0, bottom=None):
+    """
+    对页面的 [top, bottom) 行区域做OCR，优先读取缓存
+    返回的坐标相对于该区域
+    """
+    bottom = page.height if bottom is None else bottom
+    if not CACHE_ENABLED:
+        return get_engine().image_to_data(page.gray_rows(top, bottom))
+    roi = (0, top, page.width, bottom)
+    cache = get_cache()
+    data = cache.get(page.sha256, OCR_CONFIG, roi)
+    if data is None:
+        data = get_engine().image_to_data(page.gray_rows(top, bottom))
+        cache.put(page.sha256, OCR_CONFIG, roi, data)
+    return data
+
+def is_cached(page, top=0, bottom=None):
+    """页面的 [top, bottom) 行区域是否已有OCR缓存"""
+    bottom = page.height if bottom is None else bottom
+    roi = (0, top, page.width, bottom)
+    return CACHE_ENABLED and get_cache().contains(page.sha256, OCR_CONFIG, roi)
+
+def demultiplex(data, offsets, heights):
+    """
+    把拼接图的OCR结果按y偏移拆回各区域
+    offsets/heights: 各区域在拼接图中的起始行和高度
+    跨越多个区域的条目（页、块级的外框）丢弃；坐标改为相对于各自区域
+    """
+    parts = [{field: [] for field in data} for _ in offsets]
+    for i, top in enumerate(data['top']):
+        k = bisect_right(offsets, top) - 1
+        if k < 0 or top + data['height'][i] > offsets[k] + heights[k]:
+            continue
+        for field in data:
+            parts[k][field].append(data[field][i])
+        parts[k]['top'][-1] = top - offsets[k]
+    return parts
+
+def batch_image_to_data(regions):
+    """
+    批量OCR：把多个页面区域竖向拼成一张图，只调用一次 image_to_data，再拆回各区域
+    regions: [(page, top, bottom), ...]
+    返回: 与 regions 一一对应的OCR字典，坐标相对于各自区域；结果同时写入缓存
+    """
+    return batch_bands_to_data([(page.sha256, page.width, top, bottom, page.gray_rows(top, bottom))
+                                for page, top, bottom in regions])
+
+def batch_bands_to_data(bands):
+    """
+    与 batch_image_to_data 相同，但直接接收已经取出的灰度行带，不需要 Page（也就不再解码页面）
+    bands: [(页面哈希, 页面宽度, top, bottom, 灰度行带), ...]
+    """
+    if not bands:
+        return []
+    heights = [band.shape[0] for *_, band in bands]
+    offsets = np.concatenate(([0], np.cumsum(heights[:-1]) + BATCH_GAP * np.arange(1, len(bands))))
+    offsets = offsets.astype(int).tolist()
+
+    canvas = np.full((offsets[-1] + heights[-1], max(band.shape[1] for *_, band in bands)), 255, np.uint8)
+    for (*_, band), offset in zip(bands, offsets):
+        canvas[offset:offset + band.shape[0], :band.shape[1]] = band
+
+    parts = demultiplex(get_engine().image_to_data(canvas), offsets, heights)
+    if CACHE_ENABLED:
+        cache = get_cache()
+        for (page_hash, width, top, bottom, _), data in zip(bands, parts):
+            cache.put(page_hash, OCR_CONFIG, (0, top, width, bottom), data)
+    return parts
+
+def main():
+    stats = get_cache().stats()
+    print("=" * 60)
+    print("🗄️  OCR缓存")
+    print("=" * 60)
+    print(f"缓存文件: {CACHE_PATH}")
+    print(f"条目数: {stats['entries']}")
+    print(f"占用: {stats['bytes'] / 1024 / 1024:.1f} MB / {CACHE_MAX_BYTES / 1024 / 1024:.0f} MB")
+    print(f"命中: {stats['hits']}  未命中: {stats['misses']}  命中率: {stats['hit_rate'] * 100:.1f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+OCR引擎 - 每个进程保持一个常驻的 Tesseract 实例
+优先使用 tesserocr：进程内调用，语言模型只加载一次，直接接收NumPy灰度缓冲区；
+未安装时退回 pytesseract：每次调用都会写临时图片并启动 tesseract 子进程。
+"""
+
+import numpy as np
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# OCR配置（中文识别）
+OCR_LANG = 'chi_sim+eng'
+OCR_OEM = 3
+OCR_PSM = 6
+OCR_CONFIG = f'--oem {OCR_OEM} --psm {OCR_PSM} -l {OCR_LANG}'
+
+# image_to_data 的列，与 pytesseract.Output.DICT 保持一致
+TSV_FIELDS = ['level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+              'left', 'top', 'width', 'height', 'conf', 'text']
+
+def parse_tsv(tsv):
+    """把 Tesseract 的TSV输出解析为与 pytesseract.Output.DICT 相同的字典"""
+    data = {field: [] for field in TSV_FIELDS}
+    for row in tsv.splitlines():
+        cols = row.split('\t')
+        if len(cols) < len(TSV_FIELDS) - 1 or not cols[0].isdigit():
+            continue
+        cols += [''] * (len(TSV_FIELDS) - len(cols))
+        for field, value in zip(TSV_FIELDS[:10], cols[:10]):
+            data[field].append(int(value))
+        data['conf'].append(float(cols[10]))
+        data['text'].append(cols[11])
+    return data
+
+def format_tsv(data):
+    """把 image_to_data 的字典写回 Tesseract TSV 文本（parse_tsv 的逆操作）"""
+    rows = ['\t'.join(TSV_FIELDS)]
+    for i in range(len(data['text'])):
+        rows.append('\t'.join(str(data[field][i]) for field in TSV_FIELDS))
+    return '\n'.join(rows) + '\n'
+
+class TesserocrEngine:
+    """常驻进程内的 Tesseract（tesserocr）"""
+    name = 'tesserocr'
+
+    def __init__(self):
+        self.api = tesserocr.PyTessBaseAPI(lang=OCR_LANG, psm=OCR_PSM, oem=OCR_OEM)
+        self.calls = 0
+
+    def version(self):
+        return tesserocr.tesseract_version().splitlines()[0]
+
+    def image_to_data(self, gray):
+        gray = np.ascontiguousarray(gray)
+        height, width = gray.shape
+        self.calls += 1
+        self.api.SetImageBytes(gray.tobytes(), width, height, 1, width)
+        return parse_tsv(self.api.GetTSVText(0))
+
+class PytesseractEngine:
+    """每次调用启动一个 tesseract 子进程"""
+    name = 'pytesseract'
+
+    def __init__(self):
+        self.calls = 0
+
+    def version(self):
+        return str(pytesseract.get_tesseract_version())
+
+    def image_to_data(self, gray):
+        self.calls += 1
+        return pytesseract.image_to_data(gray, config=OCR_CONFIG,
+                                         output_type=pytesseract.Output.DICT)
+
+_engine = None
+
+def get_engine():
+    """返回当前进程的OCR引擎（首次调用时创建，之后复用）"""
+    global _engine
+    if _engine is None:
+        try:
+            if tesserocr is None:
+                raise RuntimeError("tesserocr 未安装")
+            _engine = TesserocrEngine()
+        except RuntimeError:
+            _engine = PytesseractEngine()
+    return _engine
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+页面图像对象 - 每张扫描页只解码一次，供各检测与裁剪阶段共享
+检测用的缩小灰度图直接让JPEG解码器按 1/2、1/4、1/8 的DCT缩放输出，
+不经过全分辨率解码；只有最终裁剪（以及OCR）才会解码全分辨率像素。
+"""
+
+import hashlib
+import io
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# PNG压缩级别（0-9），与PIL默认的 6 一致，输出大小与原先相同
+PNG_COMPRESSION = 6
+
+# JPEG解码器原生支持的缩放倍数（DCT缩放，直接输出灰度）
+REDUCED_GRAYSCALE = {
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+class Page:
+    """
+    一张扫描页
+    原始文件只读取一次；彩色、灰度、缩小、二值等视图在第一次使用时生成并缓存，
+    OCR、线检测和裁剪阶段拿到的是同一份像素缓冲区。
+    尺寸从文件头读取，缩小图按需以DCT缩放解码，都不会触发全分辨率解码。
+    """
+
+    def __init__(self, path, data=None):
+        self.path = Path(path)
+        self._data = data
+        self._sha256 = None
+        self._size = None
+        self._bgr = None
+        self._gray = None
+        self._small = {}
+        self._binary = {}
+
+    @property
+    def data(self):
+        """原始文件字节"""
+        if self._data is None:
+            self._data = self.path.read_bytes()
+        return self._data
+
+    @property
+    def sha256(self):
+        """文件内容哈希，用作缓存键"""
+        if self._sha256 is None:
+            self._sha256 = hashlib.sha256(self.data).hexdigest()
+        return self._sha256
+
+    def _decode(self, flags):
+        # 忽略EXIF方向：OpenCV默认会按方向标记旋转，而文件头尺寸（PIL）和原先的PIL裁剪都不旋转，
+        # 所有视图都必须与 size 在同一坐标系中
+        img = cv2.imdecode(np.frombuffer(self.data, np.uint8), flags | cv2.IMREAD_IGNORE_ORIENTATION)
+        if img is None:
+            raise ValueError(f"无法解码图片: {self.path.name}")
+        return img
+
+    @property
+    def bgr(self):
+        """全分辨率彩色图 (BGR)"""
+        if self._bgr is None:
+            self._bgr = self._decode(cv2.IMREAD_COLOR)
+        return self._bgr
+
+    @property
+    def gray(self):
+        """全分辨率灰度图（未解码彩色图时直接解码为灰度）"""
+        if self._gray is None:
+            if self._bgr is not None:
+                self._gray = cv2.cvtColor(self._bgr, cv2.COLOR_BGR2GRAY)
+            else:
+                self._gray = self._decode(cv2.IMREAD_GRAYSCALE)
+        return self._gray
+
+    def gray_rows(self, top, bottom):
+        """
+        全分辨率灰度行带
+        已有灰度图时直接切片；否则只转换彩色图（最终裁剪同样需要）中的这一段
+        """
+        if self._gray is not None:
+            return self._gray[top:bottom]
+        return cv2.cvtColor(self.bgr[top:bottom], cv2.COLOR_BGR2GRAY)
+
+    @property
+    def size(self):
+        """(宽, 高)，从文件头读取，不解码像素"""
+        if self._size is None:
+            if self._bgr is not None:
+                self._size = (self._bgr.shape[1], self._bgr.shape[0])
+            else:
+                self._size = Image.open(io.BytesIO(self.data)).size
+        return self._size
+
+    @property
+    def height(self):
+        return self.size[1]
+
+    @property
+    def width(self):
+        return self.size[0]
+
+    def small(self, scale):
+        """
+        按 1/scale 缩小的灰度图
+        scale 为 2/4/8 且还没有全分辨率灰度图时，由JPEG解码器直接按DCT缩放输出
+        """
+        if scale <= 1:
+            return self.gray
+        if scale not in self._small:
+            if self._gray is None and scale in REDUCED_GRAYSCALE:
+                self._small[scale] = self._decode(REDUCED_GRAYSCALE[scale])
+            else:
+                self._small[scale] = cv2.resize(
+                    self.gray, (self.width // scale, self.height // scale),
+                    interpolation=cv2.INTER_AREA)
+        return self._small[scale]
+
+    def binary(self, thresh=240):
+        """反色二值图：墨迹为255，背景为0"""
+        if thresh not in self._binary:
+            _, self._binary[thresh] = cv2.threshold(
+                self.gray, thresh, 255, cv2.THRESH_BINARY_INV)
+        return self._binary[thresh]
+
+    def crop(self, top, bottom, left=0, right=None, pad=0):
+        """
+        裁剪区域，返回原图的NumPy视图（不复制像素）
+        pad > 0 时四周加白边，由 copyMakeBorder 一次生成带边距的新数组
+        """
+        region = self.bgr[top:bottom, left:right]
+        if pad <= 0:
+            return region
+        return cv2.copyMakeBorder(region, pad, pad, pad, pad, cv2.BORDER_CONSTANT,
+                                  value=(255, 255, 255))
+
+
+def refine_row(page, y, radius, left=0, right=None):
+    """
+    在全分辨率图像 y±radius 行范围内找墨迹最多的一行
+    用于把缩小图上检测到的直线位置映射回原图
+    """
+    top = max(0, y - radius)
+    band = page.gray_rows(top, y + radius + 1)[:, left:right]
+    if band.size == 0:
+        return y
+    return top + int(np.argmax(np.count_nonzero(band < 128, axis=1)))
+
+
+def as_page(image):
+    """接受路径或 Page，统一返回 Page"""
+    return image if isinstance(image, Page) else Page(image)
+
+
+def encode_image(pixels, ext=".jpg", quality=95):
+    """把像素数组编码为图片字节（直接从缓冲区编码，不经过PIL）"""
+    params = []
+    if ext.lower() in (".jpg", ".jpeg"):
+        params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+    elif ext.lower() == ".png":
+        params = [cv2.IMWRITE_PNG_COMPRESSION, PNG_COMPRESSION]
+    ok, buf = cv2.imencode(ext, pixels, params)
+    if not ok:
+        raise ValueError(f"图片编码失败: {ext}")
+    return buf.tobytes()
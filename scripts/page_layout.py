@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+页面版面 - 每页只做一次整页OCR，把词框、行号等保存为TSV放在页面旁边
+例如 图片/101766031408_.pic.jpg -> 图片/101766031408_.pic.layout.tsv
+文件第一行记录页面内容哈希和OCR配置，页面或配置变化后旧的版面自动失效。
+分割检测、图形提取（遮住文字区域）和题号识别都直接读取版面，不再各自调用OCR。
+
+用法:
+  python3 page_layout.py
+"""
+
+import os
+import sys
+from pathlib import Path
+
+from ocr_cache import cached_image_to_data
+from ocr_engine import OCR_CONFIG, format_tsv, get_engine, parse_tsv
+from page_image import Page
+from pipeline import run_pipeline
+
+# 配置
+SOURCE_DIR = Path("/Users/youyou/Downloads/M压轴/packages/图片")
+LAYOUT_SUFFIX = ".layout.tsv"
+
+# 并行进程数，以及流水线中最多同时在途的页面数
+WORKERS = os.cpu_count() or 1
+QUEUE_DEPTH = WORKERS * 2
+
+def layout_path(image_path):
+    """页面对应的版面文件路径"""
+    image_path = Path(image_path)
+    return image_path.with_name(image_path.stem + LAYOUT_SUFFIX)
+
+def layout_stamp(image_path):
+    """版面文件的指纹（大小和修改时间），没有版面时返回None；供增量构建判断版面是否更新"""
+    try:
+        stat = layout_path(image_path).stat()
+    except OSError:
+        return None
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def _header(page):
+    return f"# page_sha256={page.sha256}\tconfig={OCR_CONFIG}\n"
+
+def load_layout(page):
+    """
+    读取页面的版面
+    返回: 与 image_to_data 相同的字典（整页坐标）；没有版面文件或已过期返回None
+    """
+    try:
+        text = layout_path(page.path).read_text(encoding='utf-8')
+    except OSError:
+        return None
+    header, _, body = text.partition('\n')
+    if header + '\n' != _header(page):
+        return None
+    return parse_tsv(body)
+
+def build_layout(page):
+    """对整页做OCR（优先读缓存），返回 (版面字典, TSV文本)"""
+    data = cached_image_to_data(page)
+    return data, _header(page) + format_tsv(data)
+
+def group_lines(data):
+    """
+    把 image_to_data 结果（或版面）中的非空词按OCR行 (block_num, par_num, line_num) 分组
+    返回: [[词下标, ...], ...]，行按首次出现的顺序，行内保持识别顺序
+    """
+    lines = {}
+    for i, text in enumerate(data['text']):
+        if text.strip():
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(key, []).append(i)
+    return list(lines.values())
+
+def select_rows(data, top, bottom):
+    """
+    取出版面中完全位于 [top, bottom) 行区域内的条目，坐标改为相对于该区域
+    与对该区域单独OCR（cached_image_to_data(page, top, bottom)）的结果格式相同
+    """
+    keep = [i for i, y in enumerate(data['top'])
+            if y >= top and y + data['height'][i] <= bottom]
+    part = {field: [data[field][i] for i in keep] for field in data}
+    part['top'] = [y - top for y in part['top']]
+    return part
+
+def process_page(image_path, data):
+    """
+    流水线工作进程中执行的单页任务：整页OCR并生成版面文件
+    返回: (词数, [(版面路径, 字节)])
+    """
+    page = Page(image_path, data)
+    layout, tsv = build_layout(page)
+    words = sum(1 for text in layout['text'] if text.strip())
+    return words, [(layout_path(image_path), tsv.encode('utf-8'))]
+
+def is_fresh(image_path):
+    """版面文件存在且与页面内容、OCR配置一致"""
+    path = layout_path(image_path)
+    if not path.exists():
+        return False
+    with open(path, encoding='utf-8') as f:
+        return f.readline() == _header(Page(image_path))
+
+def main():
+    print("=" * 60)
+    print("📑 页面版面（整页OCR）")
+    print("=" * 60)
+    print(f"源目录: {SOURCE_DIR}")
+    print(f"并行进程: {WORKERS}")
+    print("=" * 60)
+
+    try:
+        engine = get_engine()
+        print(f"✅ Tesseract OCR 已安装 ({engine.name} {engine.version()})")
+    except Exception:
+        print("❌ Tesseract OCR 未安装")
+        sys.exit(1)
+
+    image_files = sorted(SOURCE_DIR.glob("*.jpg"))
+    pending = [p for p in image_files if not is_fresh(p)]
+    total = len(pending)
+    print(f"\n找到 {len(image_files)} 张图片，其中 {total} 张需要生成版面")
+    print("-" * 60)
+
+    success_count = 0
+    fail_count = 0
+    for i, img_path, words, written, error in run_pipeline(pending, process_page, WORKERS, QUEUE_DEPTH):
+        print(f"[{i + 1}/{total}] {img_path.name}", end=" ")
+        if written:
+            print(f"✅ {words} 个词")
+            success_count += 1
+        else:
+            print(f"❌ 失败{f': {error}' if error else ''}")
+            fail_count += 1
+
+    print("-" * 60)
+    print(f"\n✅ 成功: {success_count} 张")
+    print(f"⏭️  跳过: {len(image_files) - total} 张（未变化）")
+    print(f"❌ 失败: {fail_count} 张")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+流式处理流水线 - 读取 → 检测/裁剪/编码 → 写出
+读取和写出各占一个I/O线程，检测与编码在进程池中执行，阶段之间用有界队列连接。
+同时在途的页面不超过 depth 张，峰值内存只取决于队列深度，与总页数无关。
+crop_images / smart_crop / extract_figures 共用。
+"""
+
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+_DONE = object()
+
+def _reader(paths, read_q):
+    """I/O线程：按顺序读取输入文件"""
+    for i, path in enumerate(paths):
+        try:
+            read_q.put((i, path, path.read_bytes(), None))
+        except OSError as e:
+            read_q.put((i, path, None, str(e)))
+    read_q.put(_DONE)
+
+def _writer(write_q, done_q):
+    """I/O线程：按顺序写出产出文件，写完后再交给调用方"""
+    while True:
+        item = write_q.get()
+        if item is _DONE:
+            done_q.put(_DONE)
+            return
+        i, path, info, outputs, error = item
+        written = []
+        try:
+            for out_path, data in outputs:
+                out_path.write_bytes(data)
+                written.append(out_path)
+        except OSError as e:
+            info, error = None, str(e)
+        done_q.put((i, path, info, written, error))
+
+def _run_isolated(process, path, data):
+    """在独立进程中重跑一页，即使该页让进程崩溃也只影响它自己"""
+    try:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            return pool.submit(process, path, data).result(), None
+    except BrokenProcessPool:
+        return None, "工作进程崩溃"
+    except Exception as e:
+        return None, str(e)
+
+def run_pipeline(paths, process, workers=1, depth=None):
+    """
+    流式处理一批文件
+    paths: 输入文件路径列表
+    process: 顶层函数 process(path, data) -> (info, outputs)，在工作进程中执行，
+             outputs 为 [(输出路径, 字节), ...]，必须可被pickle（可用 functools.partial 绑定参数）
+    workers: 进程数，<=1 时在主线程中处理（读写仍在I/O线程中）
+    depth: 每个队列及进程池中最多在途的页面数，默认 workers 的两倍
+    按输入顺序逐页产出 (index, path, info, 已写出的路径列表, error)
+    """
+    depth = depth or max(2, workers * 2)
+    read_q = queue.Queue(maxsize=depth)
+    write_q = queue.Queue(maxsize=depth)
+    done_q = queue.Queue()
+
+    threading.Thread(target=_reader, args=(paths, read_q), daemon=True).start()
+    threading.Thread(target=_writer, args=(write_q, done_q), daemon=True).start()
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    inflight = deque()
+
+    def drain(block=False):
+        while True:
+            try:
+                item = done_q.get(block=block)
+            except queue.Empty:
+                return
+            if item is _DONE:
+                return
+            yield item
+
+    def recover():
+        """
+        进程池已损坏：已完成的页面照常输出，其余在途页面逐张在独立进程中重跑，
+        找出导致崩溃的页面，然后换一个新的进程池继续
+        """
+        nonlocal pool
+        pool.shutdown(wait=False, cancel_futures=True)
+        while inflight:
+            i, path, data, future, error = inflight.popleft()
+            info, outputs = None, []
+            if error is None:
+                if future is not None and future.done() and not future.cancelled() \
+                        and future.exception() is None:
+                    info, outputs = future.result()
+                else:
+                    result, error = _run_isolated(process, path, data)
+                    if result:
+                        info, outputs = result
+            write_q.put((i, path, info, outputs, error))
+        pool = ProcessPoolExecutor(max_workers=workers)
+
+    def finish_oldest():
+        """等待最早提交的一页完成并交给写线程（保持输入顺序）"""
+        i, path, data, future, error = inflight[0]
+        if error is not None:
+            inflight.popleft()
+            write_q.put((i, path, None, [], error))
+            return
+        try:
+            info, outputs = future.result()
+        except BrokenProcessPool:
+            recover()
+            return
+        except Exception as e:
+            info, outputs, error = None, [], str(e)
+        inflight.popleft()
+        write_q.put((i, path, info, outputs, error))
+
+    try:
+        while True:
+            item = read_q.get()
+            if item is _DONE:
+                break
+            i, path, data, error = item
+            if pool is None:
+                if error is None:
+                    try:
+                        info, outputs = process(path, data)
+                    except Exception as e:
+                        info, outputs, error = None, [], str(e)
+                else:
+                    info, outputs = None, []
+                write_q.put((i, path, info, outputs, error))
+            else:
+                future = None
+                if error is None:
+                    try:
+                        future = pool.submit(process, path, data)
+                    except BrokenProcessPool:
+                        pass
+                inflight.append((i, path, data, future, error))
+                if future is None and error is None:
+                    recover()
+                elif len(inflight) >= depth:
+                    finish_oldest()
+            yield from drain()
+
+        while inflight:
+            finish_oldest()
+            yield from drain()
+
+        write_q.put(_DONE)
+        yield from drain(block=True)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+进程内单例 - OCR缓存、图形索引等SQLite连接共用
+SQLite连接不能跨 fork 使用：流水线的工作进程从父进程继承来的连接不复用，按进程号重新创建。
+"""
+
+import os
+
+def process_local(factory):
+    """
+    返回 get()：每个进程第一次调用时用 factory() 创建对象，之后返回同一个
+    factory 在调用时才读取配置（例如模块级的路径常量），便于运行前修改
+    """
+    state = {'pid': None, 'value': None}
+
+    def get():
+        if state['pid'] != os.getpid():
+            state['value'] = factory()
+            state['pid'] = os.getpid()
+        return state['value']
+    return get
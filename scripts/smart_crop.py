@@ -1,14 +1,19 @@
 #!/usr/bin/env python3
 """
-智能裁剪脚本 - 使用OCR检测"针对训练"位置并精确裁剪
+智能裁剪脚本 - 检测"针对训练"位置并精确裁剪
+分割点由一条检测器级联决定：按开销从低到高依次运行（投影 → 线检测 → 模板匹配 → OCR），
+某一级的可信度达到门限、或两级的结果一致时立即停止，每页记录各级的结果和耗时。
 """
 
+import json
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 
 try:
-    from PIL import Image
     import pytesseract
     import cv2
     import numpy as np
@@ -19,213 +24,561 @@ except ImportError as e:
     print("\n还需要安装Tesseract OCR:")
     print("  macOS: brew install tesseract tesseract-lang")
     print("  Ubuntu: sudo apt install tesseract-ocr tesseract-ocr-chi-sim")
+    print("\n可选（进程内常驻OCR引擎，速度更快）:")
+    print("  pip3 install tesserocr")
     sys.exit(1)
 
+from build_manifest import Manifest, file_sha256, local_modules, write_json
+from horizontal_rules import find_horizontal_rules
+from ocr_cache import CACHE_ENABLED, batch_bands_to_data, cached_image_to_data, get_cache, is_cached
+from ocr_engine import get_engine
+from page_image import Page, as_page, encode_image, refine_row
+from page_layout import group_lines, layout_stamp, load_layout, select_rows
+from pipeline import run_pipeline
+
 # 配置
 SOURCE_DIR = Path("/Users/youyou/Downloads/M压轴/packages/图片")
 OUTPUT_DIR = Path("/Users/youyou/Downloads/M压轴/packages/图片_智能裁剪")
 
-# 要检测的关键词
-KEYWORDS = ["针对训练", "对训练", "训练"]
+# 并行进程数（1 表示在主进程中处理），以及流水线中最多同时在途的页面数
+WORKERS = os.cpu_count() or 1
+QUEUE_DEPTH = WORKERS * 2
+
+# 金字塔检测：水平线检测在 1/PYRAMID_SCALE 的缩小图上运行，候选位置再回到原图精确定位
+# 设为 1 则在全分辨率上检测
+PYRAMID_SCALE = 2
+
+# 要检测的标题：从真实页面截取的"针对训练"标题模板（用 harvest_templates.py 采集），
+# 文件名以标题文字开头，例如 针对训练_01.png
+TEMPLATE_DIR = Path(__file__).resolve().parent / "templates"
+KEYWORDS = sorted(TEMPLATE_DIR.glob("*.png"))
+
+# OCR检测时按优先级匹配的文字，以及优先检测标题的页面区域（页高比例）
+OCR_KEYWORDS = ["针对训练", "对训练", "训练"]
+KEYWORD_BAND = (0.35, 0.65)
+
+# 模板匹配：在 1/TEMPLATE_SCALE 的缩小图上匹配，模板另按这几个尺寸缩放以容许扫描大小差异
+TEMPLATE_SCALE = 4
+TEMPLATE_SIZES = (0.9, 1.0, 1.1)
+
+# 批量OCR：每次把这么多页的关键词区域拼成一张图识别（设为 1 则逐页识别）
+OCR_BATCH = 8
+
+# 分割点允许的范围，以及所有方法都失败时的默认比例
+SPLIT_RANGE = (0.3, 0.7)
+DEFAULT_RATIO = 0.48
+
+# 投影检测：扫描区域、空白行判定阈值（每行墨迹占比）、可信度门限，以及在几分之一分辨率上统计
+PROFILE_BAND = (0.30, 0.70)
+PROFILE_BLANK_RATIO = 0.002
+PROFILE_CONFIDENCE = 0.5
+PROFILE_SCALE = 2
+
+# 线检测、模板匹配与OCR的可信度门限
+RULE_CONFIDENCE = 0.75
+TEMPLATE_CONFIDENCE = 0.7
+KEYWORD_CONFIDENCE = 0.75
+
+# 分割检测级联：(方法, 可信度门限)，按开销从低到高排列
+SPLIT_CASCADE = [
+    ("投影", PROFILE_CONFIDENCE),
+    ("线检测", RULE_CONFIDENCE),
+    ("模板", TEMPLATE_CONFIDENCE),
+    ("OCR", KEYWORD_CONFIDENCE),
+]
+
+# 两级检测结果相差不超过页高的这个比例时视为一致，直接采用
+AGREE_RATIO = 0.02
+
+# 每页的级联记录（各级结果与耗时），保存在输出目录中
+TRACE_NAME = ".split_trace.json"
+
+# 等待批量OCR的页面在第一轮流水线中的 method
+DEFERRED = "待OCR"
+
+def find_blank_gutter(page):
+    """
+    行投影检测：统计30%-70%区域每一行的墨迹像素，找出最宽的空白行带
+    "针对训练"标题上方通常有一条明显的空白，最宽空白带比第二宽的越突出，可信度越高
+    返回: (y坐标, 可信度0~1)，没有空白带时返回 (None, 0.0)
+    """
+    page = as_page(page)
+    gray = page.small(PROFILE_SCALE)
+    height, width = gray.shape
+    top = int(height * PROFILE_BAND[0])
+    bottom = int(height * PROFILE_BAND[1])
+    
+    # 每行墨迹像素数 -> 空白行
+    ink = np.count_nonzero(gray[top:bottom] < 160, axis=1)
+    blank = ink <= max(2, width * PROFILE_BLANK_RATIO)
+    
+    # 连续空白行的起止位置
+    edges = np.diff(np.concatenate(([0], blank.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if len(starts) == 0:
+        return None, 0.0
+    
+    runs = ends - starts
+    order = np.argsort(runs)[::-1]
+    widest = runs[order[0]]
+    second = runs[order[1]] if len(runs) > 1 else 0
+    
+    # 空白带太窄（不足页高1%）时视为普通行距
+    if widest < height * 0.01:
+        return None, 0.0
+    
+    confidence = 1.0 - second / widest
+    split_y = top + int(starts[order[0]] + widest // 2)
+    return split_y * PROFILE_SCALE, float(confidence)
+
+def find_keyword_box(data, keywords=OCR_KEYWORDS):
+    """
+    在 image_to_data 的结果中按优先级查找关键词
+    中文常被切成单字，所以把同一行里相邻的词拼接后再匹配
+    返回: ((left, top, right, bottom), 命中的关键词)，未找到返回 (None, None)
+    """
+    lines = group_lines(data)
+    
+    for keyword in keywords:
+        for words in lines:
+            for i in range(len(words)):
+                joined = ''
+                for j in range(i, len(words)):
+                    joined += data['text'][words[j]].strip()
+                    if keyword in joined:
+                        span = words[i:j + 1]
+                        box = (min(data['left'][k] for k in span),
+                               min(data['top'][k] for k in span),
+                               max(data['left'][k] + data['width'][k] for k in span),
+                               max(data['top'][k] + data['height'][k] for k in span))
+                        return box, keyword
+                    if len(joined) >= len(keyword) * 2:
+                        break
+    return None, None
+
+def match_keywords(data, keywords=OCR_KEYWORDS):
+    """
+    在 image_to_data 的结果中按优先级查找关键词
+    返回: (命中词的顶部y坐标, 命中的关键词)，未找到返回 (None, None)
+    """
+    box, keyword = find_keyword_box(data, keywords)
+    return (None, None) if box is None else (box[1], keyword)
 
-def find_keyword_position(image_path):
+def keyword_band(page):
+    """关键词区域的 (起始行, 结束行)"""
+    return int(page.height * KEYWORD_BAND[0]), int(page.height * KEYWORD_BAND[1])
+
+def find_keyword_position(page):
     """
     使用OCR检测图片中"针对训练"的位置
-    返回: y坐标（从顶部开始），如果未找到返回None
+    已有页面版面（page_layout.py）时直接在版面的词框中查找，不再调用OCR；
+    否则先识别中部35%-65%区域（通常已由批量OCR写入缓存），没找到再识别整页
+    命中的关键词越完整越可信：完整的"针对训练"为 1.0，只认出"训练"为 0.5
+    page: Page 对象或图片路径
+    返回: (y坐标, 可信度0~1)，如果未找到返回 (None, 0.0)
     """
     try:
-        # 读取图片
-        img = cv2.imread(str(image_path))
-        if img is None:
-            return None
-            
-        # 转为灰度图
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # 获取图片尺寸
-        height, width = gray.shape
-        
-        # 使用Tesseract进行OCR，获取每个字符的位置
-        # 配置为中文识别
-        custom_config = r'--oem 3 --psm 6 -l chi_sim+eng'
-        
-        # 获取详细的OCR数据（包含位置信息）
-        data = pytesseract.image_to_data(gray, config=custom_config, output_type=pytesseract.Output.DICT)
-        
-        # 搜索关键词
-        text = ' '.join(data['text'])
-        
-        for keyword in KEYWORDS:
-            if keyword in text:
-                # 找到关键词的位置
-                for i, word in enumerate(data['text']):
-                    if keyword in word or (i > 0 and keyword in data['text'][i-1] + word):
-                        # 返回该词的顶部y坐标
-                        return data['top'][i]
-        
-        # 如果没找到关键词，尝试在图片中部区域搜索
-        # 扫描图片的40%-60%区域
-        scan_start = int(height * 0.35)
-        scan_end = int(height * 0.65)
-        
-        for keyword in KEYWORDS:
-            # 在扫描区域内逐行搜索
-            for y in range(scan_start, scan_end, 30):
-                roi = gray[y:min(y+60, height), :]
-                roi_text = pytesseract.image_to_string(roi, config=custom_config)
-                if keyword in roi_text:
-                    return y
+        page = as_page(page)
+        layout = load_layout(page)
+
+        # 一次调用拿到整条带的词框，所有关键词都在同一结果上匹配，重复运行时直接读缓存
+        scan_start, scan_end = keyword_band(page)
+        if layout is not None:
+            band = select_rows(layout, scan_start, scan_end)
+        else:
+            band = cached_image_to_data(page, scan_start, scan_end)
+        split_y, keyword = match_keywords(band)
+        if split_y is not None:
+            split_y += scan_start
+        else:
+            # 中部没找到关键词，再查整页
+            split_y, keyword = match_keywords(layout if layout is not None else cached_image_to_data(page))
         
-        return None
+        if split_y is None:
+            return None, 0.0
+        return split_y, len(keyword) / len(OCR_KEYWORDS[0])
         
     except Exception as e:
         print(f"  OCR错误: {e}")
-        return None
+        return None, 0.0
+
+_templates = None
+
+def load_templates():
+    """
+    读取标题模板（进程内只读一次），每个模板按 TEMPLATE_SIZES 生成多个尺寸
+    返回: [(缩小到检测分辨率的模板, 全分辨率模板), ...]
+    """
+    global _templates
+    if _templates is None:
+        _templates = []
+        for path in KEYWORDS:
+            img = cv2.imdecode(np.fromfile(str(path), np.uint8), cv2.IMREAD_GRAYSCALE)
+            if img is None:
+                continue
+            for size in TEMPLATE_SIZES:
+                full = cv2.resize(img, None, fx=size, fy=size, interpolation=cv2.INTER_AREA)
+                small = cv2.resize(img, None, fx=size / TEMPLATE_SCALE, fy=size / TEMPLATE_SCALE,
+                                   interpolation=cv2.INTER_AREA)
+                if min(small.shape) >= 4:
+                    _templates.append((small, full))
+    return _templates
+
+def find_header_template(page):
+    """
+    模板匹配检测"针对训练"标题，不调用OCR
+    在 1/TEMPLATE_SCALE 缩小图的关键词区域上，对每个模板、每个尺寸做归一化互相关，
+    取得分最高的位置，再用对应的全分辨率模板在原图附近几行内精确定位
+    page: Page 对象或图片路径
+    返回: (标题顶部y坐标, 匹配得分0~1)，没有模板或未匹配到时返回 (None, 0.0)
+    """
+    templates = load_templates()
+    if not templates:
+        return None, 0.0
+    
+    page = as_page(page)
+    gray = page.small(TEMPLATE_SCALE)
+    top = int(gray.shape[0] * KEYWORD_BAND[0])
+    band = gray[top:int(gray.shape[0] * KEYWORD_BAND[1])]
+    
+    best = None
+    for small, full in templates:
+        if small.shape[0] > band.shape[0] or small.shape[1] > band.shape[1]:
+            continue
+        _, score, _, (x, y) = cv2.minMaxLoc(cv2.matchTemplate(band, small, cv2.TM_CCOEFF_NORMED))
+        if best is None or score > best[0]:
+            best = (score, x, y, full)
+    if best is None or best[0] <= 0:
+        return None, 0.0
+    
+    score, x, y, full = best
+    scale = TEMPLATE_SCALE
+    y = (top + y) * scale
+    if scale <= 1:
+        return y, float(score)
+    
+    # 回到原图，在候选位置附近 ±2*scale 像素内精确定位
+    y0 = max(0, y - 2 * scale)
+    x0 = max(0, x * scale - 2 * scale)
+    window = page.gray_rows(y0, y + full.shape[0] + 2 * scale)[:, x0:x * scale + full.shape[1] + 2 * scale]
+    if window.shape[0] < full.shape[0] or window.shape[1] < full.shape[1]:
+        return y, float(score)
+    _, _, _, (_, dy) = cv2.minMaxLoc(cv2.matchTemplate(window, full, cv2.TM_CCOEFF_NORMED))
+    return y0 + dy, float(score)
 
-def detect_horizontal_line(image_path):
+def detect_horizontal_line(page, scale=PYRAMID_SCALE):
     """
     检测图片中的水平分隔线位置
-    返回: y坐标，如果未找到返回None
+    page: Page 对象或图片路径
+    scale: 在 1/scale 的缩小图上用形态学开运算找长水平线，再在原图上精确定位
+    线越接近页宽越可信（占页宽80%及以上为 1.0）
+    返回: (y坐标（原图坐标）, 可信度0~1)，如果未找到返回 (None, 0.0)
     """
     try:
-        img = cv2.imread(str(image_path))
-        if img is None:
-            return None
-            
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        page = as_page(page)
+        gray = page.small(scale)
         height, width = gray.shape
         
-        # 边缘检测
-        edges = cv2.Canny(gray, 50, 150, apertureSize=3)
+        # 只考虑图片中间区域（35%-65%）、长度超过页宽一半的线
+        band = (int(height * 0.35), int(height * 0.65))
+        rules = find_horizontal_rules(gray, width * 0.5, band)
         
-        # 霍夫线变换检测水平线
-        lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=100, 
-                                minLineLength=width*0.5, maxLineGap=10)
+        if rules:
+            # 返回最接近中间的水平线
+            center = height * 0.5
+            rule = min(rules, key=lambda rule: abs(rule['y'] - center))
+            confidence = min(1.0, rule['length'] / (width * 0.8))
+            if scale <= 1:
+                return rule['y'], confidence
+            # 回到原图，在候选行附近找墨迹最多的一行
+            return refine_row(page, rule['y'] * scale, 2 * scale), confidence
         
-        if lines is not None:
-            horizontal_lines = []
-            for line in lines:
-                x1, y1, x2, y2 = line[0]
-                # 检查是否为水平线（y坐标差异小于10像素）
-                if abs(y2 - y1) < 10:
-                    # 只考虑图片中间区域的线（35%-65%）
-                    avg_y = (y1 + y2) // 2
-                    if height * 0.35 < avg_y < height * 0.65:
-                        horizontal_lines.append(avg_y)
-            
-            if horizontal_lines:
-                # 返回最接近中间的水平线
-                center = height * 0.5
-                return min(horizontal_lines, key=lambda y: abs(y - center))
-        
-        return None
+        return None, 0.0
         
     except Exception as e:
         print(f"  线检测错误: {e}")
-        return None
+        return None, 0.0
+
+def needs_keyword_ocr(page):
+    """既没有页面版面也没有关键词区域的OCR缓存，OCR一级需要调用 Tesseract"""
+    return load_layout(page) is None and not is_cached(page, *keyword_band(page))
+
+def ocr_band_batch(bands):
+    """
+    把一组页面的关键词区域拼成一张图做一次OCR，结果写入缓存
+    bands: [(页面哈希, 页面宽度, top, bottom, 灰度行带), ...]，来自 process_page 推迟的页面
+    """
+    batch_bands_to_data(bands)
+    return len(bands)
+
+def batch_keyword_ocr(bands):
+    """
+    批量OCR：每 OCR_BATCH 页的关键词区域识别一次
+    每批在进程池中执行；某一批失败或让工作进程崩溃时只是不写缓存，
+    这些页面随后在流水线中逐页OCR，不影响整个运行
+    返回: (写入缓存的页数, OCR调用次数)
+    """
+    batches = [bands[i:i + OCR_BATCH] for i in range(0, len(bands), OCR_BATCH)]
+    done = 0
+    for batch in batches:
+        try:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                done += pool.submit(ocr_band_batch, batch).result()
+        except Exception as e:
+            print(f"  ⚠️  批量OCR失败，这 {len(batch)} 页改为逐页OCR: {e or type(e).__name__}")
+    return done, len(batches)
+
+def output_paths(image_path, output_dir):
+    """返回 (例题路径, 习题路径)"""
+    image_path = Path(image_path)
+    filename = image_path.stem
+    ext = image_path.suffix
+    return (output_dir / f"{filename}_例题{ext}",
+            output_dir / f"{filename}_习题{ext}")
+
+# 级联中的检测器: 名称 -> 函数(page) -> (y坐标或None, 可信度0~1)
+SPLIT_DETECTORS = {
+    "投影": find_blank_gutter,
+    "线检测": detect_horizontal_line,
+    "模板": find_header_template,
+    "OCR": find_keyword_position,
+}
+
+def run_cascade(page, cascade=None, trace=None):
+    """
+    按顺序运行级联中的检测器（默认 SPLIT_CASCADE），满足任一条件即停止：
+    1. 当前一级的可信度达到该级门限
+    2. 当前一级与之前某一级的结果相差不超过 AGREE_RATIO（取两者中可信度高的）
+    返回: (method, split_y, trace)，没有一级满足条件时 method 为None、split_y 为最可信的候选（可能为None）；
+          trace 为各级的 {'stage', 'y', 'confidence', 'ms'} 列表
+    trace: 之前已经运行过的各级结果（例如推迟OCR的第一轮流水线），这些级直接复用，不再运行
+    """
+    tolerance = page.height * AGREE_RATIO
+    done = {t['stage']: t for t in trace or []}
+    trace = []
+    for name, threshold in SPLIT_CASCADE if cascade is None else cascade:
+        if name not in done:
+            start = time.perf_counter()
+            split_y, confidence = SPLIT_DETECTORS[name](page)
+            done[name] = {'stage': name, 'y': None if split_y is None else int(split_y),
+                          'confidence': round(float(confidence), 3),
+                          'ms': round((time.perf_counter() - start) * 1000, 2)}
+        trace.append(done[name])
+        split_y, confidence = trace[-1]['y'], trace[-1]['confidence']
+        if split_y is None:
+            continue
+        if confidence >= threshold:
+            return name, split_y, trace
+        for earlier in trace[:-1]:
+            if earlier['y'] is not None and abs(earlier['y'] - split_y) <= tolerance:
+                best = max(earlier, trace[-1], key=lambda t: t['confidence'])
+                return best['stage'], best['y'], trace
+    
+    candidates = [t for t in trace if t['y'] is not None]
+    if not candidates:
+        return None, None, trace
+    return None, max(candidates, key=lambda t: t['confidence'])['y'], trace
+
+def find_split(page, trace=None):
+    """
+    检测分割点
+    1. 按 SPLIT_CASCADE 的顺序运行级联，某一级足够可信或两级一致时采用
+    2. 都不满足时采用级联中最可信的候选
+    3. 没有任何候选时使用默认比例(48%)
+    trace: 已经运行过的各级结果，见 run_cascade
+    返回: (method, split_y, trace)，split_y 已限制在 SPLIT_RANGE 内
+    """
+    height = page.height
+    method, split_y, trace = run_cascade(page, trace=trace)
+    
+    if method is None and split_y is not None:
+        method = next(t['stage'] for t in trace if t['y'] == split_y)
+    
+    if split_y is None:
+        split_y = int(height * DEFAULT_RATIO)
+        method = "默认"
+    
+    # 确保分割点在合理范围内
+    split_y = max(int(height * SPLIT_RANGE[0]), min(split_y, int(height * SPLIT_RANGE[1])))
+    return method, split_y, trace
+
+def process_page(image_path, data, output_dir, traces=None, defer_ocr=False):
+    """
+    流水线工作进程中执行的单页任务：检测分割点并编码两张裁剪图
+    整页只解码一次，各检测方法共享同一个 Page。
+    traces: 上一轮已运行过的各级结果 {文件名: trace}，这些级不再重复运行
+    defer_ocr: OCR之前的各级都没能定下分割点、且需要调用OCR时，先不做OCR也不裁剪，
+               返回该页的关键词区域供批量OCR，之后再带着 trace 重新处理
+    返回: ((method, split_y, height, trace, band), [(输出路径, 字节), ...])；
+          推迟的页面 method 为 DEFERRED，band 为 (页面哈希, 页面宽度, top, bottom, 灰度行带)，否则为None
+    """
+    page = Page(image_path, data)
+    trace = (traces or {}).get(page.path.name)
+    if defer_ocr:
+        cheap = [stage for stage in SPLIT_CASCADE if stage[0] != "OCR"]
+        method, _, trace = run_cascade(page, cheap, trace)
+        if method is None and needs_keyword_ocr(page):
+            top, bottom = keyword_band(page)
+            band = (page.sha256, page.width, top, bottom, page.gray_rows(top, bottom))
+            return (DEFERRED, None, page.height, trace, band), []
+    method, split_y, trace = find_split(page, trace)
+    
+    # 裁剪（NumPy切片，不再重新解码）
+    ext = page.path.suffix
+    example_path, exercise_path = output_paths(page.path, output_dir)
+    outputs = [
+        (example_path, encode_image(page.crop(0, split_y), ext, quality=95)),
+        (exercise_path, encode_image(page.crop(split_y, page.height), ext, quality=95)),
+    ]
+    return (method, split_y, page.height, trace, None), outputs
 
 def smart_crop(image_path, output_dir):
     """
-    智能裁剪图片
-    1. 首先尝试OCR检测"针对训练"位置
-    2. 如果失败，尝试检测水平分隔线
-    3. 如果都失败，使用默认比例(48%)
+    智能裁剪单张图片并保存
+    返回: (method, split_y, height)，失败时全部为None
     """
     try:
-        img = Image.open(image_path)
-        width, height = img.size
-        
-        # 方法1: OCR检测关键词位置
-        split_y = find_keyword_position(image_path)
-        method = "OCR"
-        
-        # 方法2: 检测水平分隔线
-        if split_y is None:
-            split_y = detect_horizontal_line(image_path)
-            method = "线检测"
-        
-        # 方法3: 默认比例
-        if split_y is None:
-            split_y = int(height * 0.48)
-            method = "默认"
-        
-        # 确保分割点在合理范围内
-        split_y = max(int(height * 0.3), min(split_y, int(height * 0.7)))
-        
-        # 裁剪
-        example_img = img.crop((0, 0, width, split_y))
-        exercise_img = img.crop((0, split_y, width, height))
-        
-        # 保存
-        filename = image_path.stem
-        ext = image_path.suffix
-        
-        example_path = output_dir / f"{filename}_例题{ext}"
-        exercise_path = output_dir / f"{filename}_习题{ext}"
-        
-        example_img.save(example_path, quality=95)
-        exercise_img.save(exercise_path, quality=95)
-        
-        return method, split_y, height
+        info, outputs = process_page(image_path, None, output_dir)
+        for path, data in outputs:
+            path.write_bytes(data)
+        return info[:3]
         
     except Exception as e:
         print(f"  处理失败: {e}")
         return None, None, None
 
+def load_traces(path, image_files):
+    """读取上次的级联记录，去掉源目录中已不存在的页面"""
+    try:
+        traces = json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+    names = {p.name for p in image_files}
+    return {name: t for name, t in traces.items() if name in names}
+
 def main():
     print("=" * 60)
     print("🎯 智能裁剪工具")
     print("=" * 60)
     print(f"源目录: {SOURCE_DIR}")
     print(f"输出目录: {OUTPUT_DIR}")
+    print(f"并行进程: {WORKERS}")
     print("=" * 60)
     
     # 检查Tesseract是否安装
     try:
-        pytesseract.get_tesseract_version()
-        print("✅ Tesseract OCR 已安装")
+        engine = get_engine()
+        print(f"✅ Tesseract OCR 已安装 ({engine.name} {engine.version()})")
     except:
         print("❌ Tesseract OCR 未安装")
         print("\n请安装Tesseract:")
         print("  macOS: brew install tesseract tesseract-lang")
         return
     
+    if not KEYWORDS:
+        print(f"⚠️  {TEMPLATE_DIR} 中没有标题模板，模板匹配一级将被跳过")
+        print("  先运行 python3 harvest_templates.py 从已有页面中采集")
+    
     # 确保输出目录存在
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     
     # 获取所有图片
     image_files = sorted(SOURCE_DIR.glob("*.jpg"))
-    total = len(image_files)
     
-    print(f"\n找到 {total} 张图片")
+    # 增量构建：跳过输入和参数都未变化的页面
+    params = {
+        "keywords": OCR_KEYWORDS,
+        "templates": [file_sha256(path) for path in KEYWORDS],
+        "template_match": [TEMPLATE_SCALE, TEMPLATE_SIZES],
+        "keyword_band": KEYWORD_BAND,
+        "split_range": SPLIT_RANGE,
+        "default_ratio": DEFAULT_RATIO,
+        "profile": [PROFILE_BAND, PROFILE_BLANK_RATIO],
+        "cascade": SPLIT_CASCADE,
+        "agree_ratio": AGREE_RATIO,
+    }
+    manifest = Manifest(OUTPUT_DIR, params, code=local_modules(__file__))
+    removed = manifest.prune(image_files)
+    # 页面版面（page_layout.py）更新后OCR一级的结果可能不同，版面指纹也作为依赖
+    deps = {p: layout_stamp(p) for p in image_files}
+    pending = [p for p in image_files if not manifest.is_fresh(p, deps[p])]
+    total = len(pending)
+    
+    print(f"\n找到 {len(image_files)} 张图片，其中 {total} 张需要处理（{len(image_files) - total} 张未变化）")
+    if removed:
+        print(f"已删除 {removed} 个过期文件")
     print("-" * 60)
     
-    stats = {"OCR": 0, "线检测": 0, "默认": 0, "失败": 0}
+    cache_before = get_cache().stats()
+    stats = {"投影": 0, "线检测": 0, "模板": 0, "OCR": 0, "默认": 0, "失败": 0}
+    stage_runs = {name: [] for name, _ in SPLIT_CASCADE}
+    trace_path = OUTPUT_DIR / TRACE_NAME
+    traces = load_traces(trace_path, image_files)
     
-    for i, img_path in enumerate(image_files, 1):
-        print(f"[{i}/{total}] {img_path.name}", end=" ")
-        method, split_y, height = smart_crop(img_path, OUTPUT_DIR)
-        
-        if method:
+    # 第一轮：需要OCR的页面先推迟，收集它们的关键词区域；其余页面直接裁剪
+    # 第二轮：推迟的页面批量OCR（结果写入缓存）后，带着第一轮的 trace 再进流水线，只补跑OCR一级
+    batching = CACHE_ENABLED and OCR_BATCH > 1
+    deferred = {}
+    done = 0
+    
+    def report(img_path, info, written, error):
+        nonlocal done
+        done += 1
+        print(f"[{done}/{total}] {img_path.name}", end=" ")
+        if info:
+            method, split_y, height, trace, _ = info
             ratio = split_y / height * 100 if height else 0
-            print(f"✅ [{method}] 分割位置: {ratio:.1f}%")
+            stages = " → ".join(f"{t['stage']} {t['ms']:.0f}ms" for t in trace)
+            print(f"✅ [{method}] 分割位置: {ratio:.1f}%  ({stages})")
             stats[method] += 1
+            for t in trace:
+                stage_runs[t['stage']].append(t['ms'])
+            traces[img_path.name] = {'method': method, 'split_y': split_y, 'stages': trace}
+            manifest.record(img_path, written, deps[img_path])
         else:
-            print("❌ 失败")
+            print(f"❌ 失败{f': {error}' if error else ''}")
             stats["失败"] += 1
     
+    try:
+        process = partial(process_page, output_dir=OUTPUT_DIR, defer_ocr=batching)
+        for _, img_path, info, written, error in run_pipeline(pending, process, WORKERS, QUEUE_DEPTH):
+            if info and info[0] == DEFERRED:
+                deferred[img_path] = info
+                continue
+            report(img_path, info, written, error)
+        
+        if deferred:
+            print("-" * 60)
+            batched, calls = batch_keyword_ocr([info[4] for info in deferred.values()])
+            print(f"🔤 批量OCR: {batched}/{len(deferred)} 页关键词区域，{calls} 次调用")
+            print("-" * 60)
+            early = {p.name: info[3] for p, info in deferred.items()}
+            process = partial(process_page, output_dir=OUTPUT_DIR, traces=early)
+            for _, img_path, info, written, error in run_pipeline(list(deferred), process, WORKERS, QUEUE_DEPTH):
+                report(img_path, info, written, error)
+    finally:
+        manifest.save()
+        write_json(trace_path, traces)
+    
     print("-" * 60)
     print("\n📊 统计:")
     for method, count in stats.items():
         if count > 0:
             print(f"  {method}: {count} 张")
     
+    print("\n⏱️  级联各级:")
+    for name, times in stage_runs.items():
+        if times:
+            print(f"  {name}: 运行 {len(times)} 次，平均 {sum(times) / len(times):.1f} ms")
+    
+    cache_after = get_cache().stats()
+    hits = cache_after['hits'] - cache_before['hits']
+    lookups = hits + cache_after['misses'] - cache_before['misses']
+    if lookups:
+        print(f"  OCR缓存命中: {hits}/{lookups} ({hits / lookups * 100:.1f}%)")
+    
     print(f"\n裁剪完成！输出目录: {OUTPUT_DIR}")
 
 if __name__ == "__main__":
     main()
-
-
-
-
-